@@ -0,0 +1,71 @@
+import atexit
+import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger('phonebook.audit')
+
+_listener = None
+_search_sample_rate = 1.0
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    A queue handler that enqueues records as they are.
+
+    The standard QueueHandler formats each message before queueing it; here
+    the message template and its arguments travel through the queue and are
+    only formatted by the listener thread.
+    """
+    def prepare(self, record):
+        return record
+
+
+def configure_audit_logging(filename='phonebook.log', level=logging.INFO, search_sample_rate=1.0):
+    """Send audit records through a queue to a file written by a background thread.
+
+    search_sample_rate is the fraction of searches that are logged. Calling
+    this again replaces the previous configuration.
+    """
+    global _listener, _search_sample_rate
+    stop_audit_logging()
+    records = queue.SimpleQueue()
+    file_handler = logging.FileHandler(filename)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+    logger.addHandler(_DeferredQueueHandler(records))
+    logger.setLevel(level)
+    logger.propagate = False
+    _search_sample_rate = search_sample_rate
+    _listener = QueueListener(records, file_handler)
+    _listener.start()
+
+
+def ensure_audit_logging():
+    """Configure audit logging with the defaults unless it is already configured."""
+    if _listener is None:
+        configure_audit_logging()
+
+
+def stop_audit_logging():
+    """Write out any queued records and stop the background thread."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    for handler in list(logger.handlers):
+        if isinstance(handler, _DeferredQueueHandler):
+            logger.removeHandler(handler)
+    _listener = None
+
+
+def log_search(message, *args):
+    """Log a search, keeping only the configured fraction of them."""
+    if _search_sample_rate < 1.0 and random.random() >= _search_sample_rate:
+        return
+    logger.info(message, *args)
+
+
+atexit.register(stop_audit_logging)
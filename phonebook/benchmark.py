@@ -0,0 +1,465 @@
+import argparse
+import cProfile
+import csv
+import gc
+import json
+import logging
+import os
+import platform
+import pstats
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from columnar import ColumnarContactStore
+from contact import Contact
+from fuzzy import FuzzyIndex
+from journal import recover_phonebook
+from phonebook import PhoneBook
+from result_cache import ResultCache
+from search_index import SubstringScanIndex, TrigramIndex
+from sharded import ShardedPhoneBook
+from validation import format_phone_numbers, validate_emails
+
+FIRST_NAMES = ['John', 'Jane', 'Alice', 'Bob', 'Emily', 'David', 'Sophia', 'Michael', 'Olivia', 'James',
+               'Emma', 'William', 'Ava', 'Benjamin', 'Mia', 'Lucas', 'Charlotte', 'Henry', 'Amelia', 'Daniel']
+LAST_NAMES = ['Doe', 'Smith', 'Johnson', 'Brown', 'Williams', 'Martinez', 'Gonzalez', 'Lee', 'Clark', 'Jones',
+              'Garcia', 'Miller', 'Davis', 'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Jackson', 'White']
+STREETS = ['Elm St', 'Oak St', 'Pine St', 'Maple St', 'Cedar St', 'Birch St', 'Main St', 'Walnut Ave']
+
+
+def generate_rows(count, seed=0):
+    """Yield synthetic (first name, last name, phone, email, address) rows like phonebook2.csv."""
+    rng = random.Random(seed)
+    for i in range(count):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES) + (str(i % 997) if i % 3 else '')
+        phone_number = f"{rng.randint(200, 999)}-{rng.randint(0, 9999999):07d}"
+        email = f"{first_name}.{last_name}{i}@example.com".lower() if i % 4 else ''
+        address = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}" if i % 5 else ''
+        yield first_name, last_name, phone_number, email, address
+
+
+def write_csv(file_path, count, seed=0):
+    """Write a synthetic CSV file with the headers and row format of phonebook2.csv."""
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['First Name', 'Last Name', 'Phone Number', 'Email', 'Address'])
+        writer.writerows(generate_rows(count, seed))
+
+
+def generate_contacts(count, seed=0):
+    """Return a list of synthetic contacts."""
+    return [Contact(*row) for row in generate_rows(count, seed)]
+
+
+class DictContact:
+    """
+    The original dict-based contact layout, kept for memory comparisons.
+    """
+    def __init__(self, first_name, last_name, phone_number, email=None, address=None):
+        """Initialize a contact the way Contact did before it used __slots__."""
+        self.first_name = first_name
+        self.last_name = last_name
+        self.phone_number = Contact.validate_and_format_phone_number(self, phone_number)
+        self.email = email
+        self.address = address
+        self.created_at = datetime.now()
+        self.updated_at = datetime.now()
+        self.history = []
+
+    def update_history(self, action):
+        """Record an action in the contact's history with a timestamp."""
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.history.append(f"{timestamp} - {action}")
+
+
+def build_phonebook(contacts, search_index=None):
+    """Return a phone book holding the given contacts, without a result cache so repeated queries are measured."""
+    phonebook = PhoneBook(search_index=search_index, result_cache=ResultCache(max_entries=0))
+    for contact in contacts:
+        phonebook.add_contact(contact)
+    return phonebook
+
+
+def sample_queries(contacts, count, seed=1):
+    """Return a mix of name, phone and missing queries drawn from the contacts."""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        contact = rng.choice(contacts)
+        kind = i % 4
+        if kind == 0:
+            queries.append(contact.last_name.lower())
+        elif kind == 1:
+            queries.append(contact.first_name[:4])
+        elif kind == 2:
+            queries.append(contact.phone_number[6:])
+        else:
+            queries.append('Zyxw')
+    return queries
+
+
+def time_queries(phonebook, queries):
+    """Return the mean latency in milliseconds of search_contacts over the queries."""
+    start = time.perf_counter()
+    for query in queries:
+        phonebook.search_contacts(query)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def bench_search(sizes, queries_per_size):
+    """Print search latency for the scan and trigram indexes at each size."""
+    print(f"{'contacts':>10} {'index':>10} {'build s':>10} {'query ms':>10}")
+    for size in sizes:
+        contacts = generate_contacts(size)
+        queries = sample_queries(contacts, queries_per_size)
+        for name, index_class in (('scan', SubstringScanIndex), ('trigram', TrigramIndex)):
+            start = time.perf_counter()
+            phonebook = build_phonebook(contacts, index_class())
+            build_seconds = time.perf_counter() - start
+            latency = time_queries(phonebook, queries)
+            print(f"{size:>10} {name:>10} {build_seconds:>10.2f} {latency:>10.3f}")
+
+
+def _added_contacts(contact_class, count):
+    """Yield synthetic contacts whose history records that they were added."""
+    for row in generate_rows(count):
+        contact = contact_class(*row)
+        contact.update_history("Added contact")
+        yield contact
+
+
+def measure_bytes(build):
+    """Return the bytes still allocated by the object that build() returns."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return allocated
+
+
+def _whole_phonebook(size, index_class):
+    """Return a phone book of synthetic contacts, for measuring it with its contacts and every index."""
+    phonebook = PhoneBook(index_class(), ResultCache(max_entries=0))
+    phonebook.add_contacts(generate_contacts(size))
+    return phonebook
+
+
+def bench_memory(sizes):
+    """Print bytes per contact for dict-based, __slots__ and columnar storage, alone and in a whole phone book.
+
+    The book rows include the contacts and every index, with the trigram or
+    the scan search index.
+    """
+    layouts = (
+        ('dict', lambda size: list(_added_contacts(DictContact, size))),
+        ('slots', lambda size: list(_added_contacts(Contact, size))),
+        ('columnar', lambda size: ColumnarContactStore(_added_contacts(Contact, size))),
+        ('book', lambda size: _whole_phonebook(size, TrigramIndex)),
+        ('book scan', lambda size: _whole_phonebook(size, SubstringScanIndex)),
+    )
+    print(f"{'contacts':>10} {'layout':>10} {'bytes/contact':>14}")
+    for size in sizes:
+        for name, build in layouts:
+            allocated = measure_bytes(lambda: build(size))
+            print(f"{size:>10} {name:>10} {allocated / size:>14.1f}")
+
+
+def run_mutations(phonebook, contacts):
+    """Add every contact, then update and delete every tenth one."""
+    for contact in contacts:
+        phonebook.add_contact(contact)
+    for contact in contacts[::10]:
+        replacement = Contact(contact.first_name, contact.last_name + 'x', contact.phone_number, contact.email)
+        phonebook.update_contact(contact.first_name, contact.last_name, contact.phone_number, replacement)
+    for contact in contacts[5::10]:
+        phonebook.delete_contact(contact.phone_number)
+    return len(contacts) + 2 * len(contacts[::10])
+
+
+def bench_journal(sizes, sync_intervals=(1, 100, 1000)):
+    """Print sustained journaled mutations per second for several fsync batch sizes."""
+    print(f"{'contacts':>10} {'sync every':>10} {'mutations/s':>12}")
+    for size in sizes:
+        for sync_every in sync_intervals:
+            contacts = generate_contacts(size)
+            with tempfile.TemporaryDirectory() as directory:
+                phonebook = recover_phonebook(os.path.join(directory, 'bench.wal'),
+                                              os.path.join(directory, 'bench.dat'),
+                                              sync_every=sync_every, compact_every=size)
+                start = time.perf_counter()
+                mutations = run_mutations(phonebook, contacts)
+                phonebook.journal.close()
+                elapsed = time.perf_counter() - start
+            print(f"{size:>10} {sync_every:>10} {mutations / elapsed:>12.0f}")
+
+
+def bench_delete(sizes, fraction=0.1):
+    """Print the time to batch delete a fraction of the contacts by phone number."""
+    print(f"{'contacts':>10} {'deleted':>10} {'seconds':>10}")
+    for size in sizes:
+        contacts = generate_contacts(size)
+        phonebook = build_phonebook(contacts)
+        queries = [contact.phone_number for contact in random.Random(2).sample(contacts, int(size * fraction))]
+        start = time.perf_counter()
+        counts = phonebook.delete_contacts_batch(queries)
+        elapsed = time.perf_counter() - start
+        print(f"{size:>10} {sum(counts.values()):>10} {elapsed:>10.2f}")
+
+
+def bench_validation(sizes):
+    """Print contacts validated per second, one Contact at a time and in column batches."""
+    print(f"{'contacts':>10} {'mode':>10} {'contacts/s':>12}")
+    for size in sizes:
+        rows = list(generate_rows(size))
+        start = time.perf_counter()
+        for row in rows:
+            Contact(*row)
+        per_contact = size / (time.perf_counter() - start)
+        start = time.perf_counter()
+        format_phone_numbers([row[2] for row in rows])
+        validate_emails([row[3] for row in rows])
+        batch = size / (time.perf_counter() - start)
+        print(f"{size:>10} {'contact':>10} {per_contact:>12.0f}")
+        print(f"{size:>10} {'batch':>10} {batch:>12.0f}")
+
+
+def misspell(name, rng):
+    """Return a name with two adjacent letters swapped, as a typical typo."""
+    if len(name) < 3:
+        return name
+    position = rng.randrange(1, len(name) - 1)
+    return name[:position] + name[position + 1] + name[position] + name[position + 2:]
+
+
+def random_surname(rng):
+    """Return a random pronounceable surname, so that nearly every contact has a distinct one."""
+    syllables = [rng.choice('bcdfghjklmnprstvwz') + rng.choice('aeiou') for _ in range(rng.randint(2, 4))]
+    return ''.join(syllables).capitalize()
+
+
+def bench_fuzzy(sizes, queries_per_size):
+    """Print fuzzy index build time and the mean latency of ranked fuzzy searches for misspelled names.
+
+    Besides the generated contacts, which share about 20,000 surnames, each
+    size is run with a distinct surname per contact, and again after half of
+    those contacts are deleted to show that dead terms do not slow queries.
+    """
+    print(f"{'contacts':>10} {'surnames':>12} {'terms':>10} {'build s':>10} {'query ms':>10}")
+    for size in sizes:
+        rng = random.Random(3)
+        generated = generate_contacts(size)
+        distinct = generate_contacts(size)
+        for contact in distinct:
+            contact.last_name = random_surname(rng)
+        for label, contacts in (('generated', generated), ('distinct', distinct)):
+            start = time.perf_counter()
+            fuzzy_index = FuzzyIndex()
+            for contact in contacts:
+                fuzzy_index.add(contact)
+            build_seconds = time.perf_counter() - start
+            for deleted in (False, True):
+                if deleted:
+                    for contact in contacts[::2]:
+                        fuzzy_index.remove(contact)
+                    contacts = contacts[1::2]
+                    label = f"{label}/2"
+                queries = [misspell(rng.choice(contacts).last_name, rng) for _ in range(queries_per_size)]
+                start = time.perf_counter()
+                for query in queries:
+                    fuzzy_index.search(query)
+                query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+                print(f"{size:>10} {label:>12} {len(fuzzy_index._term_contacts):>10} "
+                      f"{build_seconds:>10.2f} {query_ms:>10.3f}")
+
+
+def bench_sharded(sizes, queries_per_size, shard_counts=(1, 2, 4, 8)):
+    """Print query throughput of a sharded phone book as the number of shard processes grows.
+
+    Scans are used for search so each query does work proportional to the
+    shard size; date filters and groupings fan out to every shard as well.
+    The shards have no result cache, so the repeated date filters and
+    groupings are computed every time rather than served from the cache.
+    """
+    print(f"{'contacts':>10} {'shards':>7} {'build s':>10} {'search/s':>10} {'dates/s':>10} {'groups/s':>10}")
+    start_date, end_date = datetime(2000, 1, 1), datetime.now()
+    for size in sizes:
+        contacts = generate_contacts(size)
+        queries = sample_queries(contacts, queries_per_size)
+        for shards in shard_counts:
+            with ShardedPhoneBook(shards, SubstringScanIndex, {'level': logging.CRITICAL},
+                                  {'max_entries': 0}) as phonebook:
+                start = time.perf_counter()
+                phonebook.add_contacts(contacts)
+                build_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                for query in queries:
+                    phonebook.search_contacts(query)
+                searches = len(queries) / (time.perf_counter() - start)
+                start = time.perf_counter()
+                for _ in queries:
+                    phonebook.filter_contacts_by_date(start_date, end_date, count_only=True)
+                date_filters = len(queries) / (time.perf_counter() - start)
+                start = time.perf_counter()
+                for _ in range(3):
+                    phonebook.group_contacts_by_initial()
+                groupings = 3 / (time.perf_counter() - start)
+            print(f"{size:>10} {shards:>7} {build_seconds:>10.2f} {searches:>10.1f} {date_filters:>10.1f} {groupings:>10.2f}")
+
+
+def bench_export(sizes, worker_counts=(0, None)):
+    """Print CSV and JSON Lines export throughput, serializing in-process and on every core."""
+    print(f"{'contacts':>10} {'format':>7} {'workers':>8} {'seconds':>10} {'rows/s':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            phonebook = PhoneBook()
+            phonebook.add_contacts(generate_contacts(size))
+            for file_format, export in (('csv', phonebook.export_contacts_to_csv),
+                                        ('jsonl', phonebook.export_contacts_to_jsonl)):
+                for workers in worker_counts:
+                    start = time.perf_counter()
+                    export(os.path.join(directory, f'export.{file_format}'), workers=workers)
+                    seconds = time.perf_counter() - start
+                    worker_label = workers if workers is not None else os.cpu_count()
+                    print(f"{size:>10} {file_format:>7} {worker_label:>8} {seconds:>10.2f} {size / seconds:>12.0f}")
+
+
+def run_operations(phonebook, contacts, operations_per_size):
+    """Call each timed PhoneBook operation on a loaded phone book, operations_per_size times where it is repeated."""
+    rng = random.Random(4)
+    queries = sample_queries(contacts, operations_per_size)
+    targets = rng.sample(contacts, min(len(contacts), operations_per_size * 2))
+    start_date, end_date = datetime(2000, 1, 1), datetime.now()
+    for contact in generate_contacts(operations_per_size, seed=5):
+        phonebook.add_contact(contact)
+    for query in queries:
+        phonebook.search_contacts(query)
+    for contact in targets:
+        phonebook.find_exact_contact(contact.first_name, contact.last_name, contact.phone_number)
+    for contact in targets[:operations_per_size]:
+        phonebook.update_contact(contact.first_name, contact.last_name, contact.phone_number,
+                                 Contact(contact.first_name, contact.last_name + 'x', contact.phone_number,
+                                         contact.email, contact.address))
+    for contact in targets[operations_per_size:]:
+        phonebook.delete_contact(contact.phone_number)
+    phonebook.delete_contacts_batch([contact.last_name.lower() for contact in rng.sample(contacts, 10)])
+    for by in ('first_name', 'last_name'):
+        phonebook.sort_contacts(by)
+        phonebook.group_contacts_by_initial(by)
+    for _ in range(operations_per_size):
+        phonebook.filter_contacts_by_date(start_date, end_date, count_only=True)
+    phonebook.filter_contacts_by_date(start_date, end_date)
+
+
+def bench_operations(sizes, operations_per_size):
+    """Time every PhoneBook operation, including CSV import, and return one record per size and operation.
+
+    Each size starts from a synthetic CSV file imported into a phone book
+    without a result cache, so repeated queries measure the operation itself.
+    The timings are read from the phone book's own operation counters.
+    """
+    records = []
+    print(f"{'contacts':>10} {'operation':<32} {'calls':>7} {'mean ms':>10} {'max ms':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            csv_path = os.path.join(directory, f'contacts{size}.csv')
+            write_csv(csv_path, size)
+            # The row-by-row import gets a phone book of its own so its add_contact calls are not counted
+            row_phonebook = PhoneBook(result_cache=ResultCache(max_entries=0))
+            row_phonebook.import_contacts_from_csv(csv_path)
+            row_import = row_phonebook.operation_stats()['import_contacts_from_csv']
+            del row_phonebook
+            phonebook = PhoneBook(result_cache=ResultCache(max_entries=0))
+            phonebook.bulk_import_contacts_from_csv(csv_path)
+            run_operations(phonebook, list(phonebook.contacts), operations_per_size)
+            stats = phonebook.operation_stats()
+            stats['import_contacts_from_csv'] = row_import
+            for operation, stat in sorted(stats.items()):
+                records.append(dict(size=size, operation=operation, **stat))
+                print(f"{size:>10} {operation:<32} {stat['calls']:>7} {stat['mean_ms']:>10.3f} {stat['max_ms']:>10.3f}")
+    return records
+
+
+SUITES = {
+    'search': lambda args: bench_search(args.sizes, args.queries),
+    'memory': lambda args: bench_memory(args.sizes),
+    'journal': lambda args: bench_journal(args.sizes),
+    'delete': lambda args: bench_delete(args.sizes),
+    'validation': lambda args: bench_validation(args.sizes),
+    'fuzzy': lambda args: bench_fuzzy(args.sizes, args.queries),
+    'sharded': lambda args: bench_sharded(args.sizes, args.queries),
+    'export': lambda args: bench_export(args.sizes),
+    'operations': lambda args: bench_operations(args.sizes, args.queries),
+}
+
+
+def run_suite(suite, args):
+    """Run one suite with the requested profiling and return its JSON report entry."""
+    report = {}
+    if args.tracemalloc:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    records = SUITES[suite](args)
+    if profiler:
+        profiler.disable()
+    report['seconds'] = time.perf_counter() - start
+    if records is not None:
+        report['results'] = records
+    # The memory suite uses tracemalloc itself, which stops the tracing started here
+    if args.tracemalloc and tracemalloc.is_tracing():
+        report['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{suite}: peak traced memory {report['peak_bytes'] / 2 ** 20:.1f} MiB")
+    if profiler:
+        profile_path = os.path.join(args.profile, f'{suite}.prof')
+        profiler.dump_stats(profile_path)
+        print(f"{suite}: profile written to {profile_path}, top functions by cumulative time:")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+    return report
+
+
+def main():
+    """Run the phone book benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description="Phone book benchmarks")
+    parser.add_argument('suites', nargs='*', metavar='suite',
+                        help=f"benchmarks to run, from {', '.join(sorted(SUITES))} (default: all)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000],
+                        help="numbers of contacts to benchmark")
+    parser.add_argument('--queries', type=int, default=40, help="queries (or repeated operations) per size")
+    parser.add_argument('--json', metavar='FILE', help="write the results as JSON for regression tracking")
+    parser.add_argument('--profile', metavar='DIR', help="profile each suite with cProfile into DIR/<suite>.prof")
+    parser.add_argument('--tracemalloc', action='store_true', help="report the peak traced memory of each suite")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    unknown = [suite for suite in args.suites if suite not in SUITES]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+    suites = {suite: run_suite(suite, args) for suite in args.suites or sorted(SUITES)}
+    if args.json:
+        report = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'sizes': args.sizes,
+            'queries': args.queries,
+            'suites': suites,
+        }
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import sys
+from array import array
+from contact import Contact
+from utils import datetime_to_micros, int_to_phone, micros_to_datetime, phone_to_int
+
+
+class ColumnarContactStore:
+    """
+    A memory-compact store that keeps contact fields in parallel columns.
+
+    Names are interned so repeated names share one string, phone numbers are
+    kept as integers, timestamps as integer microseconds and empty histories
+    as None. Contacts are materialized on access.
+    """
+    def __init__(self, contacts=()):
+        """Initialize the store, optionally filling it from an iterable of contacts."""
+        self.first_names = []
+        self.last_names = []
+        self.phone_numbers = array('q')
+        self.emails = []
+        self.addresses = []
+        self.created_at = array('q')
+        self.updated_at = array('q')
+        self.histories = []
+        self.extend(contacts)
+
+    def append(self, contact):
+        """Append a contact to the store."""
+        self.first_names.append(sys.intern(contact.first_name))
+        self.last_names.append(sys.intern(contact.last_name))
+        self.phone_numbers.append(phone_to_int(contact.phone_number))
+        self.emails.append(contact.email)
+        self.addresses.append(contact.address)
+        self.created_at.append(datetime_to_micros(contact.created_at))
+        self.updated_at.append(datetime_to_micros(contact.updated_at))
+        self.histories.append(list(contact.history) if contact.history else None)
+
+    def extend(self, contacts):
+        """Append every contact of an iterable to the store."""
+        for contact in contacts:
+            self.append(contact)
+
+    def __len__(self):
+        """Return the number of stored contacts."""
+        return len(self.first_names)
+
+    def __getitem__(self, index):
+        """Materialize the contact at the given position."""
+        history = self.histories[index]
+        return Contact.from_record(self.first_names[index], self.last_names[index],
+                                   int_to_phone(self.phone_numbers[index]),
+                                   self.emails[index], self.addresses[index],
+                                   micros_to_datetime(self.created_at[index]),
+                                   micros_to_datetime(self.updated_at[index]),
+                                   list(history) if history else [])
+
+    def __iter__(self):
+        """Materialize every stored contact in order."""
+        for index in range(len(self)):
+            yield self[index]
@@ -1,10 +1,37 @@
-import re
+import time
 from datetime import datetime
+from validation import format_phone_number, validate_email
+
+# Action codes stored in contact history entries
+ADDED = 'A'
+UPDATED = 'U'
+DELETED = 'D'
+MERGED = 'M'
+
+ACTION_NAMES = {
+    ADDED: 'Added contact',
+    UPDATED: 'Updated contact',
+    DELETED: 'Deleted contact',
+    MERGED: 'Merged duplicate contacts',
+}
+
+def format_history_entry(entry):
+    """Format a (timestamp, action code, detail) history entry for display."""
+    if isinstance(entry, str):
+        return entry
+    timestamp, action, detail = entry
+    text = f"{datetime.fromtimestamp(timestamp):%Y-%m-%d %H:%M:%S} - {ACTION_NAMES.get(action, action)}"
+    if detail:
+        text += f" from {detail}"
+    return text
 
 class Contact:
     """
     A class to represent a contact in the phone book.
     """
+    __slots__ = ('first_name', 'last_name', 'phone_number', 'email', 'address',
+                 'created_at', 'updated_at', 'history')
+
     def __init__(self, first_name, last_name, phone_number, email=None, address=None):
         """Initialize a new contact with the given details."""
         self.first_name = first_name
@@ -12,30 +39,39 @@ class Contact:
         self.phone_number = self.validate_and_format_phone_number(phone_number)
         self.email = self.validate_email(email)
         self.address = address
-        self.created_at = datetime.now()
-        self.updated_at = datetime.now()
+        self.created_at = self.updated_at = datetime.now()
         self.history = []
 
+    @classmethod
+    def from_record(cls, first_name, last_name, phone_number, email, address,
+                    created_at, updated_at, history=None):
+        """Rebuild a contact from already validated fields without re-validating them."""
+        contact = cls.__new__(cls)
+        contact.first_name = first_name
+        contact.last_name = last_name
+        contact.phone_number = phone_number
+        contact.email = email
+        contact.address = address
+        contact.created_at = created_at
+        contact.updated_at = updated_at
+        contact.history = history if history is not None else []
+        return contact
+
     def validate_and_format_phone_number(self, phone_number):
         """Validate and format the phone number into (###) ###-#### format."""
-        digits = re.sub(r'\D', '', phone_number)
-        if len(digits) != 10:
-            raise ValueError("Phone number must contain exactly 10 digits")
-        formatted_number = f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
-        return formatted_number
+        return format_phone_number(phone_number)
 
     def validate_email(self, email):
         """Validate the email address against standard criteria."""
-        if email:
-            pattern = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
-            if not pattern.match(email):
-                raise ValueError("Invalid email address")
-        return email
-
-    def update_history(self, action):
-        """Record an action in the contact's history with a timestamp."""
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.history.append(f"{timestamp} - {action}")
+        return validate_email(email)
+
+    def update_history(self, action, detail=None):
+        """Record an action code and optional detail in the contact's history with a raw timestamp."""
+        self.history.append((time.time(), action, detail))
+
+    def formatted_history(self):
+        """Return the contact's history entries formatted for display."""
+        return [format_history_entry(entry) for entry in self.history]
 
     def __str__(self):
         """Return a string representation of the contact."""
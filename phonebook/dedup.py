@@ -0,0 +1,89 @@
+from fuzzy import soundex, transposition_distance
+from validation import phone_digits
+
+# Contacts sharing a phone number and Soundex codes are compared pairwise;
+# blocks larger than this (e.g. a switchboard number) are left alone.
+MAX_BLOCK_SIZE = 50
+
+
+class _DisjointSet:
+    """
+    Union-find over list positions, used to grow duplicate clusters.
+    """
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, first, second):
+        first, second = self.find(first), self.find(second)
+        if first != second:
+            self.parent[max(first, second)] = min(first, second)
+
+
+def _similar_names(first, second):
+    """Check whether two contacts' first and last names are each at most one typo apart."""
+    return (transposition_distance(first.first_name.lower(), second.first_name.lower(), 1) <= 1 and
+            transposition_distance(first.last_name.lower(), second.last_name.lower(), 1) <= 1)
+
+
+def find_duplicate_clusters(contacts):
+    """Return groups of two or more contacts that describe the same person.
+
+    Contacts are blocked by phone digits plus the Soundex codes of both names,
+    and by exact name plus email. Two contacts are duplicates when they share
+    a phone number and their names are at most one typo apart, or when they
+    share a name and an email address. Each block is small, so this runs in
+    near-linear time. Clusters and their members keep the input order.
+    """
+    contacts = list(contacts)
+    clusters = _DisjointSet(len(contacts))
+    phone_blocks = {}
+    email_blocks = {}
+    for position, contact in enumerate(contacts):
+        phone_key = (phone_digits(contact.phone_number), soundex(contact.first_name), soundex(contact.last_name))
+        phone_blocks.setdefault(phone_key, []).append(position)
+        if contact.email:
+            email_key = (contact.first_name.lower(), contact.last_name.lower(), contact.email.lower())
+            if email_key in email_blocks:
+                clusters.union(email_blocks[email_key], position)
+            else:
+                email_blocks[email_key] = position
+    for block in phone_blocks.values():
+        if len(block) < 2 or len(block) > MAX_BLOCK_SIZE:
+            continue
+        for i, first in enumerate(block):
+            for second in block[i + 1:]:
+                if clusters.find(first) != clusters.find(second) and _similar_names(contacts[first], contacts[second]):
+                    clusters.union(first, second)
+
+    groups = {}
+    for position in range(len(contacts)):
+        groups.setdefault(clusters.find(position), []).append(contacts[position])
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def _history_time(entry):
+    """Return the timestamp of a history entry; old string entries sort first."""
+    return entry[0] if isinstance(entry, tuple) else 0
+
+
+def merge_cluster(cluster):
+    """Choose the surviving contact of a cluster and the details it should end up with.
+
+    The earliest created contact survives. Its missing email and address are
+    filled from the others, and the histories of all members are combined in
+    time order. Returns (survivor, others, email, address, history).
+    """
+    survivor = min(cluster, key=lambda contact: contact.created_at)
+    others = [contact for contact in cluster if contact is not survivor]
+    email = survivor.email or next((contact.email for contact in others if contact.email), survivor.email)
+    address = survivor.address or next((contact.address for contact in others if contact.address),
+                                       survivor.address)
+    history = sorted((entry for contact in cluster for entry in contact.history), key=_history_time)
+    return survivor, others, email, address, history
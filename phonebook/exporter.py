@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from importer import HEADER_MAPPING
+
+# The CSV columns are the importer's canonical headers, so an export can be imported again
+CSV_HEADERS = list(HEADER_MAPPING)
+JSON_FIELDS = ('first_name', 'last_name', 'phone_number', 'email', 'address', 'created_at', 'updated_at')
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def contact_to_row(contact):
+    """Return the exported fields of a contact as a tuple, cheap to send to a worker process.
+
+    A missing email or address stays None: CSV writes it as an empty field
+    and JSON Lines as null.
+    """
+    return (contact.first_name, contact.last_name, contact.phone_number, contact.email,
+            contact.address, contact.created_at.isoformat(), contact.updated_at.isoformat())
+
+
+def serialize_csv(rows):
+    """Return a chunk of rows as CSV text without the header."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(row[:len(CSV_HEADERS)] for row in rows)
+    return buffer.getvalue()
+
+
+def serialize_jsonl(rows):
+    """Return a chunk of rows as JSON Lines text, one object per contact."""
+    return ''.join(json.dumps(dict(zip(JSON_FIELDS, row))) + '\n' for row in rows)
+
+
+SERIALIZERS = {'csv': serialize_csv, 'jsonl': serialize_jsonl}
+
+
+def iter_serialized_chunks(contacts, file_format, chunk_size=10000, workers=0):
+    """Yield (number of contacts, serialized text) for each chunk of contacts, in order.
+
+    Serialization runs in a pool of workers processes (all cores when None,
+    in-process when 0), with at most two chunks per worker in flight.
+    """
+    serialize = SERIALIZERS[file_format]
+    rows = map(contact_to_row, contacts)
+    chunks = iter(lambda: list(islice(rows, chunk_size)), [])
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 0:
+        for chunk in chunks:
+            yield len(chunk), serialize(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((len(chunk), executor.submit(serialize, chunk)))
+            if len(pending) >= workers * 2:
+                size, future = pending.popleft()
+                yield size, future.result()
+        while pending:
+            size, future = pending.popleft()
+            yield size, future.result()
+
+
+def write_export(contacts, file_path, file_format='csv', chunk_size=10000, workers=0):
+    """Write contacts to a CSV or JSON Lines file and return how many were written.
+
+    The file is written through a large buffer one serialized chunk at a time,
+    so memory is bounded by the chunk size rather than by the number of contacts.
+    """
+    if file_format not in SERIALIZERS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    count = 0
+    with open(file_path, 'w', newline='', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as file:
+        if file_format == 'csv':
+            csv.writer(file).writerow(CSV_HEADERS)
+        for size, text in iter_serialized_chunks(contacts, file_format, chunk_size, workers):
+            file.write(text)
+            count += size
+    return count
+
+
+def select_contacts(phonebook, query=None, start_date=None, end_date=None, by='created_at'):
+    """Return an iterator over the contacts matching a search query and a date range.
+
+    Without a query contacts come from the date index in chronological order
+    when a date bound is given, and in book order otherwise. A date bound of
+    None is open.
+    """
+    if query is None:
+        if start_date is None and end_date is None:
+            return phonebook.iter_contacts()
+        return phonebook.iter_contacts_by_date(start_date, end_date, by)
+    contacts = phonebook.iter_search_contacts(query)
+    if start_date is not None:
+        contacts = (contact for contact in contacts if getattr(contact, by) >= start_date)
+    if end_date is not None:
+        contacts = (contact for contact in contacts if getattr(contact, by) <= end_date)
+    return contacts
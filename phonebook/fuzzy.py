@@ -0,0 +1,251 @@
+import heapq
+import sys
+from collections import Counter
+
+_SOUNDEX_CODES = {}
+for _letters, _code in (('bfpv', '1'), ('cgjkqsxz', '2'), ('dt', '3'), ('l', '4'), ('mn', '5'), ('r', '6')):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _code
+
+
+def soundex(name):
+    """Return the American Soundex code of a name, or '' if it has no letters."""
+    letters = [char for char in name.lower() if 'a' <= char <= 'z']
+    if not letters:
+        return ''
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], '')
+    for char in letters[1:]:
+        digit = _SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w do not separate letters with the same code; vowels do
+        if char not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def edit_distance(first, second, max_distance=None):
+    """Return the Levenshtein distance between two strings.
+
+    With max_distance, stop as soon as the distance is known to exceed it
+    and return max_distance + 1.
+    """
+    if len(first) < len(second):
+        first, second = second, first
+    if max_distance is not None and len(first) - len(second) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(second) + 1))
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (first_char != second_char)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    if max_distance is not None:
+        return min(previous[-1], max_distance + 1)
+    return previous[-1]
+
+
+def transposition_distance(first, second, max_distance=None):
+    """Return the edit distance counting a swap of adjacent characters as one edit.
+
+    This is the optimal string alignment distance. It is not a metric, so
+    the index matches terms under the Levenshtein distance and only ranks
+    them with this one. With max_distance, return max_distance + 1 once the
+    distance is known to exceed it.
+    """
+    if max_distance is not None and abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+    rows = [list(range(len(second) + 1))]
+    for i, first_char in enumerate(first, 1):
+        current = [i]
+        for j, second_char in enumerate(second, 1):
+            cost = min(rows[-1][j] + 1, current[j - 1] + 1, rows[-1][j - 1] + (first_char != second_char))
+            if i > 1 and j > 1 and first_char == second[j - 2] and first[i - 2] == second_char:
+                cost = min(cost, rows[-2][j - 2] + 1)
+            current.append(cost)
+        # A swap reaches back two rows, so stop only when both rows are out of range
+        if max_distance is not None and min(current) > max_distance and min(rows[-1]) > max_distance:
+            return max_distance + 1
+        rows.append(current)
+    if max_distance is not None:
+        return min(rows[-1][-1], max_distance + 1)
+    return rows[-1][-1]
+
+
+def _bigrams(term):
+    """Return the distinct character bigrams of a term padded at both ends."""
+    padded = f"\x00{term}\x00"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class BigramTermIndex:
+    """
+    Strings indexed by their padded character bigrams for edit distance search.
+
+    An edit changes at most two bigrams, so a term within max_distance of the
+    query shares at least max(query bigrams, term bigrams) - 2 * max_distance
+    distinct bigrams with it. Counting shared bigrams over the posting sets
+    and comparing lengths leaves few candidates to check with edit_distance.
+    """
+    def __init__(self):
+        """Initialize an empty index."""
+        self._postings = {}
+        self._gram_counts = {}
+        self._terms_by_length = {}
+
+    def __len__(self):
+        """Return the number of terms in the index."""
+        return len(self._gram_counts)
+
+    def __contains__(self, term):
+        return term in self._gram_counts
+
+    def add(self, term):
+        """Insert a term; inserting a term already present does nothing."""
+        if term in self._gram_counts:
+            return
+        grams = _bigrams(term)
+        self._gram_counts[term] = len(grams)
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(term)
+        self._terms_by_length.setdefault(len(term), set()).add(term)
+
+    def remove(self, term):
+        """Delete a term; deleting a term that is not present does nothing."""
+        if self._gram_counts.pop(term, None) is None:
+            return
+        for gram in _bigrams(term):
+            postings = self._postings[gram]
+            postings.discard(term)
+            if not postings:
+                del self._postings[gram]
+        terms = self._terms_by_length[len(term)]
+        terms.discard(term)
+        if not terms:
+            del self._terms_by_length[len(term)]
+
+    def search(self, term, max_distance):
+        """Return (distance, term) pairs for every term within max_distance of the given term."""
+        grams = _bigrams(term)
+        length = len(term)
+        gram_counts = self._gram_counts
+        shared = Counter()
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings:
+                shared.update(postings)
+        minimum = len(grams) - 2 * max_distance
+        candidates = {candidate for candidate, count in shared.items() if count >= minimum
+                      if abs(len(candidate) - length) <= max_distance
+                      and count >= gram_counts[candidate] - 2 * max_distance}
+        if len(grams) <= 2 * max_distance:
+            # Short terms can be within max_distance while sharing no bigram at all
+            for candidate_length in range(max(0, length - max_distance), length + max_distance + 1):
+                candidates.update(candidate for candidate in self._terms_by_length.get(candidate_length, ())
+                                  if gram_counts[candidate] <= 2 * max_distance)
+        matches = []
+        for candidate in candidates:
+            distance = edit_distance(term, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, candidate))
+        return matches
+
+
+class FuzzyIndex:
+    """
+    Finds contacts whose first or last names are close to the query's words.
+
+    Names are indexed as lowercased terms in a BigramTermIndex for bounded
+    edit distance search and by Soundex code for phonetic matches, so a query
+    only compares against nearby terms rather than every contact. A term is
+    dropped from both as soon as no contact uses it.
+    """
+    def __init__(self):
+        """Initialize an empty fuzzy index."""
+        self._spelling = BigramTermIndex()
+        self._term_contacts = {}
+        self._phonetic_terms = {}
+        self._contact_terms = {}
+
+    @staticmethod
+    def _terms(contact):
+        """Return the distinct lowercased name words of a contact."""
+        return tuple({*map(sys.intern, contact.first_name.lower().split()),
+                      *map(sys.intern, contact.last_name.lower().split())})
+
+    def add(self, contact):
+        """Add a contact to the index."""
+        terms = self._terms(contact)
+        self._contact_terms[contact] = terms
+        for term in terms:
+            contacts = self._term_contacts.get(term)
+            if contacts is None:
+                contacts = self._term_contacts[term] = {}
+                self._phonetic_terms.setdefault(soundex(term), set()).add(term)
+                self._spelling.add(term)
+            contacts[contact] = None
+
+    def remove(self, contact):
+        """Remove a contact from the index."""
+        for term in self._contact_terms.pop(contact, ()):
+            contacts = self._term_contacts.get(term)
+            if contacts is None:
+                continue
+            contacts.pop(contact, None)
+            if not contacts:
+                del self._term_contacts[term]
+                self._spelling.remove(term)
+                code = soundex(term)
+                self._phonetic_terms[code].discard(term)
+                if not self._phonetic_terms[code]:
+                    del self._phonetic_terms[code]
+
+    def _term_costs(self, word, max_distance):
+        """Return {term: cost} for the terms matching one query word.
+
+        The cost is the edit distance with adjacent swaps counted once,
+        reduced by half when the term also sounds like the word, so typos
+        like "jonh" rank "john" first. Terms that only sound alike cost
+        max_distance + 1 before the reduction however far apart they are
+        spelled, which keeps a large phonetic group cheap to rank.
+        """
+        costs = {}
+        for _, term in self._spelling.search(word, max_distance):
+            costs[term] = transposition_distance(word, term)
+        for term in self._phonetic_terms.get(soundex(word), ()):
+            distance = costs[term] if term in costs else transposition_distance(word, term, max_distance)
+            costs[term] = distance - 0.5
+        return costs
+
+    def search(self, query, max_distance=2, limit=10):
+        """Return up to limit (score, contact) pairs, best first, for contacts matching every query word.
+
+        A word matches a name term within max_distance edits or with the same
+        Soundex code; the score is the summed cost of each word's best term.
+        """
+        words = query.lower().split()
+        if not words:
+            return []
+        scores = None
+        for word in words:
+            word_scores = {}
+            for term, cost in self._term_costs(word, max_distance).items():
+                for contact in self._term_contacts[term]:
+                    if scores is not None and contact not in scores:
+                        continue
+                    if cost < word_scores.get(contact, cost + 1):
+                        word_scores[contact] = cost
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {contact: scores[contact] + cost for contact, cost in word_scores.items()}
+            if not scores:
+                return []
+        return heapq.nsmallest(limit, ((score, contact) for contact, score in scores.items()),
+                               key=lambda pair: pair[0])
@@ -0,0 +1,134 @@
+import csv
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from contact import Contact
+from validation import EMAIL_ERROR, PHONE_LENGTH_ERROR, format_phone_numbers, validate_emails
+
+# Map related headers to expected fields
+HEADER_MAPPING = {
+    'First Name': ['First Name', 'FirstName', 'first_name', 'firstname'],
+    'Last Name': ['Last Name', 'LastName', 'last_name', 'lastname'],
+    'Phone Number': ['Phone Number', 'PhoneNumber', 'phone_number', 'phonenumber'],
+    'Email': ['Email', 'Email Address', 'email', 'email_address'],
+    'Address': ['Address', 'address', 'Address (Optional)', 'address_optional']
+}
+
+MANDATORY_HEADERS = ('First Name', 'Last Name', 'Phone Number')
+MISSING_NAME_ERROR = "Row is missing First Name or Last Name"
+
+
+def map_headers(headers):
+    """Return a dict from each expected field to the matching CSV header, or None if absent."""
+    headers = headers or []
+    mapped = {}
+    for expected_header, candidates in HEADER_MAPPING.items():
+        mapped[expected_header] = next((header for header in candidates if header in headers), None)
+    return mapped
+
+
+class ImportReport:
+    """
+    A summary of a bulk CSV import.
+    """
+    def __init__(self, file_path):
+        """Initialize an empty report for the given file."""
+        self.file_path = file_path
+        self.imported = 0
+        self.merged = 0
+        self.rejected = []
+        self.error = None
+
+    def reject(self, line_number, row, reason):
+        """Record a row that could not be imported."""
+        self.rejected.append((line_number, row, reason))
+
+    @property
+    def ok(self):
+        """Return True if the file could be read."""
+        return self.error is None
+
+    def __str__(self):
+        """Return a one-line summary of the import."""
+        if self.error:
+            return f"Import of {self.file_path} failed: {self.error}"
+        summary = f"Imported {self.imported} contacts from {self.file_path}, rejected {len(self.rejected)} rows"
+        if self.merged:
+            summary += f", merged {self.merged} duplicates"
+        return summary
+
+
+def build_contacts(chunk, columns):
+    """Validate a chunk of (line number, row) pairs and return (contacts, rejected rows).
+
+    This runs in worker processes, so it only takes and returns picklable values.
+    The phone and email columns of the chunk are validated in one batch each.
+    """
+    first_name_header, last_name_header, phone_number_header, email_header, address_header = columns
+    rows = [row for _, row in chunk]
+    phone_numbers = format_phone_numbers([row.get(phone_number_header) for row in rows])
+    emails = [row.get(email_header) for row in rows] if email_header else [None] * len(rows)
+    valid_emails = validate_emails(emails)
+    now = datetime.now()
+    contacts = []
+    rejected = []
+    for (line_number, row), phone_number, email, email_ok in zip(chunk, phone_numbers, emails, valid_emails):
+        first_name = row.get(first_name_header)
+        last_name = row.get(last_name_header)
+        if first_name is None or last_name is None:
+            rejected.append((line_number, row, MISSING_NAME_ERROR))
+        elif phone_number is None:
+            rejected.append((line_number, row, PHONE_LENGTH_ERROR))
+        elif not email_ok:
+            rejected.append((line_number, row, EMAIL_ERROR))
+        else:
+            contacts.append(Contact.from_record(first_name, last_name, phone_number, email,
+                                                row.get(address_header) if address_header else None,
+                                                now, now))
+    return contacts, rejected
+
+
+def iter_row_chunks(reader, chunk_size):
+    """Yield lists of (line number, row) pairs of at most chunk_size rows."""
+    chunk = []
+    for row in reader:
+        chunk.append((reader.line_num, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_validated_chunks(file_path, report, chunk_size=10000, workers=None):
+    """Stream a CSV file and yield (contacts, rejected rows) per chunk, in file order.
+
+    Validation runs in a pool of workers processes (all cores when None, in-process
+    when 0). At most two chunks per worker are in flight, so memory stays bounded
+    regardless of the file size. Header problems are recorded on the report.
+    """
+    with open(file_path, mode='r', newline='') as file:
+        reader = csv.DictReader(file)
+        mapped = map_headers(reader.fieldnames)
+        if not all(mapped[header] for header in MANDATORY_HEADERS):
+            report.error = "CSV file is missing mandatory headers (First Name, Last Name, Phone Number)"
+            return
+        columns = tuple(mapped[header] for header in HEADER_MAPPING)
+        chunks = iter_row_chunks(reader, chunk_size)
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 0:
+            for chunk in chunks:
+                yield build_contacts(chunk, columns)
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(build_contacts, chunk, columns))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
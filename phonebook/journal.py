@@ -0,0 +1,210 @@
+import json
+import os
+from audit import logger
+from contact import Contact
+from phonebook import PhoneBook
+from storage import ContactFile, write_contacts
+from utils import datetime_to_micros, micros_to_datetime
+
+
+def contact_to_record(contact):
+    """Return a JSON-serializable dict of every field of a contact."""
+    return {
+        'first_name': contact.first_name,
+        'last_name': contact.last_name,
+        'phone_number': contact.phone_number,
+        'email': contact.email,
+        'address': contact.address,
+        'created_at': datetime_to_micros(contact.created_at),
+        'updated_at': datetime_to_micros(contact.updated_at),
+        'history': list(contact.history),
+    }
+
+
+def history_from_record(history):
+    """Turn history entries decoded from JSON back into (timestamp, action, detail) tuples."""
+    return [tuple(entry) if isinstance(entry, list) else entry for entry in history]
+
+
+def contact_from_record(record):
+    """Rebuild a contact from a dict produced by contact_to_record."""
+    return Contact.from_record(record['first_name'], record['last_name'], record['phone_number'],
+                               record['email'], record['address'],
+                               micros_to_datetime(record['created_at']),
+                               micros_to_datetime(record['updated_at']),
+                               history_from_record(record['history']))
+
+
+class Journal:
+    """
+    An append-only write-ahead log of phone book mutations.
+
+    Each add, update and delete is appended as one JSON line with a sequence
+    number. The file is fsynced once every sync_every records (and on sync or
+    close), and once compact_every records have accumulated the whole book is
+    written to a snapshot file and the log is truncated.
+    """
+    def __init__(self, journal_path, snapshot_path, sync_every=100, compact_every=100000, sequence=0):
+        """Open the journal for appending, continuing from the given sequence number."""
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self.sync_every = sync_every
+        self.compact_every = compact_every
+        self.sequence = sequence
+        self._unsynced = 0
+        self._since_compaction = 0
+        self._file = open(journal_path, 'ab')
+
+    def _write(self, record):
+        """Write a record with the next sequence number."""
+        self.sequence += 1
+        record['seq'] = self.sequence
+        self._file.write(json.dumps(record, separators=(',', ':')).encode('utf-8') + b'\n')
+        self._unsynced += 1
+        self._since_compaction += 1
+
+    def _append(self, phonebook, record):
+        """Write a record, syncing and compacting when due."""
+        self._write(record)
+        self._maintain(phonebook)
+
+    def _maintain(self, phonebook):
+        """Sync and compact the journal when due."""
+        if self._unsynced >= self.sync_every:
+            self.sync()
+        if self.compact_every and self._since_compaction >= self.compact_every:
+            self.compact(phonebook)
+
+    def record_add(self, phonebook, contact):
+        """Log that a contact was added."""
+        self._append(phonebook, {'op': 'add', 'contact': contact_to_record(contact)})
+
+    def record_adds(self, phonebook, contacts):
+        """Log that contacts were added, syncing and compacting only after all are written."""
+        for contact in contacts:
+            self._write({'op': 'add', 'contact': contact_to_record(contact)})
+        self._maintain(phonebook)
+
+    def record_update(self, phonebook, old_key, contact):
+        """Log that the contact identified by old_key now has the given details.
+
+        The creation time is logged too, to tell apart contacts sharing old_key.
+        """
+        self._append(phonebook, {'op': 'update', 'key': list(old_key),
+                                 'created_at': datetime_to_micros(contact.created_at),
+                                 'contact': contact_to_record(contact)})
+
+    def record_deletes(self, phonebook, contacts):
+        """Log that contacts were deleted, syncing and compacting only after all are written."""
+        for contact in contacts:
+            self._write({'op': 'delete', 'key': [contact.first_name, contact.last_name, contact.phone_number],
+                         'created_at': datetime_to_micros(contact.created_at)})
+        self._maintain(phonebook)
+
+    def sync(self):
+        """Flush buffered records and fsync the journal file."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def compact(self, phonebook):
+        """Snapshot the phone book and truncate the journal.
+
+        The snapshot records the current sequence number, so if we crash before
+        the truncation, replay skips the records the snapshot already holds.
+        """
+        self.sync()
+        write_contacts(phonebook.contacts, self.snapshot_path, self.sequence)
+        self._file.truncate(0)
+        self._file.seek(0)
+        self.sync()
+        self._since_compaction = 0
+        logger.info("Compacted journal at sequence %d", self.sequence)
+
+    def close(self):
+        """Sync and close the journal file."""
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+
+def _find_recorded_contact(phonebook, record):
+    """Find the contact an update or delete record refers to, preferring the matching creation time."""
+    candidates = phonebook.find_exact_contacts(*record['key'])
+    if 'created_at' in record:
+        created_at = micros_to_datetime(record['created_at'])
+        for contact in candidates:
+            if contact.created_at == created_at:
+                return contact
+    return candidates[0] if candidates else None
+
+
+def apply_record(phonebook, record):
+    """Apply one journal record to a phone book that has no journal attached."""
+    op = record['op']
+    if op == 'add':
+        phonebook.restore_contacts([contact_from_record(record['contact'])])
+        return
+    contact = _find_recorded_contact(phonebook, record)
+    if contact is None:
+        logger.warning("Journal record %d refers to a missing contact: %s", record['seq'], record['key'])
+        return
+    if op == 'update':
+        fields = record['contact']
+        phonebook._set_contact_fields(contact, fields['first_name'], fields['last_name'],
+                                      fields['phone_number'], fields['email'], fields['address'],
+                                      micros_to_datetime(fields['updated_at']))
+        contact.history = history_from_record(fields['history'])
+    elif op == 'delete':
+        phonebook._remove_contact(contact)
+
+
+def read_records(journal_path):
+    """Return the complete records of a journal file and the byte length they span.
+
+    A crash can leave a partially written last line; reading stops there.
+    """
+    records = []
+    valid_length = 0
+    if not os.path.exists(journal_path):
+        return records, valid_length
+    with open(journal_path, 'rb') as file:
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+            valid_length += len(line)
+    return records, valid_length
+
+
+def recover_phonebook(journal_path, snapshot_path, search_index=None, **journal_options):
+    """Rebuild a phone book from its snapshot and journal and attach a journal to it.
+
+    The snapshot is mapped rather than read, as in PhoneBook.restore_file, so
+    it is only decoded once a journal record or an operation needs it.
+    """
+    phonebook = PhoneBook(search_index=search_index)
+    sequence = 0
+    if os.path.exists(snapshot_path):
+        snapshot = ContactFile(snapshot_path)
+        sequence = snapshot.sequence
+        phonebook.restore_file(snapshot)
+
+    records, valid_length = read_records(journal_path)
+    replayed = 0
+    for record in records:
+        if record['seq'] > sequence:
+            apply_record(phonebook, record)
+            sequence = record['seq']
+            replayed += 1
+    if os.path.exists(journal_path) and os.path.getsize(journal_path) > valid_length:
+        logger.warning("Discarding a torn record at the end of %s", journal_path)
+        with open(journal_path, 'r+b') as file:
+            file.truncate(valid_length)
+
+    phonebook.journal = Journal(journal_path, snapshot_path, sequence=sequence, **journal_options)
+    logger.info("Recovered %d contacts, replayed %d journal records", len(phonebook), replayed)
+    return phonebook
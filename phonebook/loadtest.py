@@ -0,0 +1,93 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlencode
+from benchmark import generate_rows
+
+
+async def request(reader, writer, method, target, body=None):
+    """Send one request on a keep-alive connection and return (status, payload)."""
+    data = json.dumps(body).encode('utf-8') if body is not None else b''
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: phonebook\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, deadline, write_ratio, rows, latencies, seed):
+    """Issue searches, and adds with probability write_ratio, until the deadline."""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            if rng.random() < write_ratio:
+                first_name, last_name, phone_number, email, address = rng.choice(rows)
+                method, target = 'POST', '/contacts'
+                body = {'first_name': first_name, 'last_name': last_name, 'phone_number': phone_number,
+                        'email': email, 'address': address}
+            else:
+                method, target, body = 'GET', '/contacts/search?' + urlencode({'q': rng.choice(rows)[1]}), None
+            start = time.perf_counter()
+            await request(reader, writer, method, target, body)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    """Return the value at the given fraction of a sorted list."""
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run(args):
+    """Seed the service if asked, then run the clients and print latency statistics."""
+    rows = list(generate_rows(max(args.seed_contacts, 1000)))
+    if args.seed_contacts:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+        for first_name, last_name, phone_number, email, address in rows[:args.seed_contacts]:
+            await request(reader, writer, 'POST', '/contacts', {
+                'first_name': first_name, 'last_name': last_name, 'phone_number': phone_number,
+                'email': email, 'address': address})
+        writer.close()
+
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*(client(args.host, args.port, deadline, args.write_ratio, rows, latencies, seed)
+                           for seed in range(args.connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    if not latencies:
+        print("No requests completed.")
+        return
+    print(f"requests: {len(latencies)}  connections: {args.connections}  seconds: {elapsed:.1f}")
+    print(f"requests/s: {len(latencies) / elapsed:.0f}")
+    print(f"p50: {percentile(latencies, 0.50) * 1000:.2f} ms  p99: {percentile(latencies, 0.99) * 1000:.2f} ms")
+
+
+def main():
+    """Load test a running phone book service from the command line."""
+    parser = argparse.ArgumentParser(description="Load test the phone book HTTP service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--connections', type=int, default=16, help="concurrent keep-alive connections")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds to run")
+    parser.add_argument('--write-ratio', type=float, default=0.05, help="fraction of requests that add contacts")
+    parser.add_argument('--seed-contacts', type=int, default=0, help="contacts to add before measuring")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
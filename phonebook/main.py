@@ -1,6 +1,32 @@
 import sys
-from phonebook import PhoneBook
+from itertools import islice
+from journal import recover_phonebook
 from contact import Contact
+from storage import StorageError
+
+DATA_FILE = 'phonebook.dat'
+JOURNAL_FILE = 'phonebook.wal'
+PAGE_SIZE = 20
+
+def show_pages(contacts, page_size=PAGE_SIZE):
+    """
+    Print contacts from an iterator one page at a time.
+
+    Only the contacts of the current page are pulled from the iterator, so the
+    first page appears at once however long the results are. Returns the
+    number of contacts printed.
+    """
+    contacts = iter(contacts)
+    shown = 0
+    while True:
+        page = list(islice(contacts, page_size))
+        for contact in page:
+            print(contact)
+        shown += len(page)
+        if len(page) < page_size:
+            return shown
+        if input(f"-- {shown} shown, press Enter for more or 'q' to stop: ").strip().lower() == 'q':
+            return shown
 
 def main():
     """
@@ -10,7 +36,13 @@ def main():
     interface for users to interact with the phone book, allowing them to perform 
     operations such as adding, searching, viewing, updating, and deleting contacts.
     """
-    phonebook = PhoneBook()
+    try:
+        phonebook = recover_phonebook(JOURNAL_FILE, DATA_FILE)
+    except StorageError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if len(phonebook):
+        print(f"Loaded {len(phonebook)} contacts.")
 
     while True:
         # Display the main menu options to the user
@@ -67,11 +99,7 @@ def main():
             if sub_choice == '1':
                 # Perform search based on user query
                 query = input("Enter search query: ")
-                results = phonebook.search_contacts(query)
-                if results:
-                    for contact in results:
-                        print(contact)
-                else:
+                if not show_pages(phonebook.iter_search_contacts(query)):
                     print("No contacts found.")
             elif sub_choice == '2':
                 # Filter contacts based on the date range
@@ -80,11 +108,7 @@ def main():
                 start_date = phonebook.validate_date(start_date)
                 end_date = phonebook.validate_date(end_date)
                 if start_date and end_date:
-                    results = phonebook.filter_contacts_by_date(start_date, end_date)
-                    if results:
-                        for contact in results:
-                            print(contact)
-                    else:
+                    if not show_pages(phonebook.iter_contacts_by_date(start_date, end_date)):
                         print("No contacts found.")
             else:
                 print("Invalid choice. Please try again.")
@@ -96,8 +120,9 @@ def main():
             sub_choice = input("Enter your choice: ")
 
             if sub_choice == '1':
-                # Display all contacts
-                phonebook.view_contacts()
+                # Display all contacts a page at a time
+                if not show_pages(phonebook.iter_contacts()):
+                    print("No contacts found.")
             elif sub_choice == '2':
                 # Sort contacts by user-selected criteria
                 print("1. Sort by first name")
@@ -114,8 +139,9 @@ def main():
                     print("Invalid choice. Please try again.")
                     continue
 
-                # Display sorted contacts
-                phonebook.view_contacts()
+                # Display sorted contacts a page at a time
+                if not show_pages(phonebook.iter_contacts()):
+                    print("No contacts found.")
             elif sub_choice == '3':
                 # Group contacts by initial letter
                 print("1. Group by first name")
@@ -253,8 +279,11 @@ def main():
             contact_to_view = results[index]
             phonebook.view_contact_history(contact_to_view)
         elif choice == '7':
+            # Snapshot the phone book and exit the application
+            phonebook.journal.compact(phonebook)
+            phonebook.journal.close()
+            print(f"Saved {len(phonebook)} contacts to {DATA_FILE}.")
             sys.exit()
-            # Exit the application
         else:
             print("Invalid choice. Please try again.")
 
@@ -1,104 +1,673 @@
 import csv
-import logging
-from contact import Contact
+import heapq
+import sys
+import threading
+from bisect import bisect_right, insort
+from itertools import islice
+from operator import attrgetter
+import audit
+from audit import logger
+from columnar import ColumnarContactStore
+from contact import ADDED, DELETED, MERGED, UPDATED, Contact
+from dedup import find_duplicate_clusters, merge_cluster
+from exporter import select_contacts, write_export
+from fuzzy import FuzzyIndex
+from importer import ImportReport, iter_validated_chunks, map_headers
+from result_cache import ResultCache
+from search_index import TrigramIndex
+from sorted_index import SortedIndex
+from validation import phone_digits
+from storage import ContactFile, write_contacts
+from timing import OperationTimings, timed
 from datetime import datetime
 
+NAME_FIELDS = ('first_name', 'last_name')
+DATE_FIELDS = ('created_at', 'updated_at')
+INDEX_GROUPS = ('phones', 'exact', 'emails', 'names', 'dates', 'text')
+
+
+class _PendingContacts:
+    """
+    The records of a restored phone book file that are not in the book yet, in file order.
+
+    The file stays mapped as their backing store. A record is materialized
+    the first time it is read and kept, so it is the same Contact however
+    often it is read. start is the book position of the first record.
+    """
+    def __init__(self, contact_file, start):
+        """Wrap an open ContactFile whose records take the positions from start on."""
+        self.file = contact_file
+        self.start = start
+        self._contacts = {}
+
+    def __len__(self):
+        """Return the number of records in the file."""
+        return len(self.file)
+
+    def __getitem__(self, index):
+        """Return the contact of the record at index, materializing it on first access."""
+        contact = self._contacts.get(index)
+        if contact is None:
+            contact = self._contacts.setdefault(index, self.file[index])
+        return contact
+
+
 class PhoneBook:
     """
     A class to manage a phone book of contacts.
     """
-    def __init__(self):
-        """Initialize an empty phone book and set up logging."""
-        self.contacts = []
-        logging.basicConfig(filename='phonebook.log', level=logging.INFO, format='%(asctime)s - %(message)s')
-
-    def add_contact(self, contact):
-        """Add a new contact to the phone book."""
-        self.contacts.append(contact)
-        contact.update_history("Added contact")
-        logging.info(f"Added contact: {contact}")
-
-    def view_contacts(self):
-        """Display all contacts in the phone book."""
-        if not self.contacts:
+    def __init__(self, search_index=None, result_cache=None):
+        """Initialize an empty phone book and set up audit logging.
+
+        search_index is the index used by search_contacts; it defaults to a
+        TrigramIndex and can be any object with add, remove and search methods.
+        result_cache holds repeated search, date filter and grouping results;
+        it defaults to a ResultCache with its default bounds. Mutations are
+        written to self.journal when one is attached, and the calls of the
+        main operations are counted and timed for operation_stats.
+        """
+        self._contacts = []
+        self._phone_index = {}
+        self._email_index = {}
+        self._exact_index = {}
+        self._search_index = search_index if search_index is not None else TrigramIndex()
+        self._order = {}
+        self._next_position = 0
+        self._name_indexes = {field: SortedIndex(self._name_key(field), self._order.__getitem__)
+                              for field in NAME_FIELDS}
+        self._sorted_by = None
+        self._chained_names = set()
+        self._book_key = self._order.__getitem__
+        # Counts the sorts that changed book order, so cursors from before one are refused
+        self._sorts = 0
+        self._initial_groups = {field: {} for field in NAME_FIELDS}
+        self._fuzzy_index = FuzzyIndex()
+        self._pending = None
+        self._unindexed = {group: [] for group in INDEX_GROUPS}
+        self._index_lock = threading.Lock()
+        self._date_indexes = {
+            'created_at': SortedIndex(lambda contact: contact.created_at, self._order.__getitem__),
+            'updated_at': SortedIndex(lambda contact: contact.updated_at, self._order.__getitem__),
+        }
+        self._cache = result_cache if result_cache is not None else ResultCache()
+        self._generation = 0
+        self._timings = OperationTimings()
+        self.journal = None
+        audit.ensure_audit_logging()
+
+    @staticmethod
+    def _phone_digits(phone_number):
+        """Return only the digits of a phone number, used as the phone index key."""
+        return phone_digits(phone_number)
+
+    @staticmethod
+    def _exact_key(first_name, last_name, phone_number):
+        """Return the exact-lookup index key for a contact's identifying fields."""
+        return (sys.intern(first_name.lower()), sys.intern(last_name.lower()), phone_number)
+
+    @staticmethod
+    def _name_key(field):
+        """Return a function giving the interned lowercased first or last name of a contact."""
+        name = attrgetter(field)
+        return lambda contact: sys.intern(name(contact).lower())
+
+    @staticmethod
+    def _initial(contact, by):
+        """Return the upper-cased first letter of a contact's first or last name."""
+        return getattr(contact, by)[:1].upper()
+
+    def _index_contacts(self, contacts, deferred=()):
+        """Add contacts to each index group, or to its pending list when it is deferred or not built yet.
+
+        A group with pending contacts only gets new ones after them, so its
+        buckets keep insertion order.
+        """
+        for group in INDEX_GROUPS:
+            pending = self._unindexed[group]
+            if group in deferred or pending:
+                pending.extend(contacts)
+            else:
+                getattr(self, f'_index_{group}')(contacts)
+
+    def _index_phones(self, contacts):
+        """Add contacts to the phone index."""
+        for contact in contacts:
+            self._phone_index.setdefault(self._phone_digits(contact.phone_number), []).append(contact)
+
+    def _index_exact(self, contacts):
+        """Add contacts to the exact-match index."""
+        for contact in contacts:
+            key = self._exact_key(contact.first_name, contact.last_name, contact.phone_number)
+            self._exact_index.setdefault(key, []).append(contact)
+
+    def _index_emails(self, contacts):
+        """Add contacts with an email to the email index."""
+        for contact in contacts:
+            if contact.email:
+                self._email_index.setdefault(contact.email.lower(), {})[contact] = None
+
+    def _index_names(self, contacts):
+        """Add contacts to the sorted name indexes and the groups by initial."""
+        for index in self._name_indexes.values():
+            index.add_many(contacts)
+        for contact in contacts:
+            for field in NAME_FIELDS:
+                self._initial_groups[field].setdefault(self._initial(contact, field), {})[contact] = None
+
+    def _index_dates(self, contacts):
+        """Add contacts to the sorted date indexes."""
+        for index in self._date_indexes.values():
+            index.add_many(contacts)
+
+    def _index_text(self, contacts):
+        """Add contacts to the search and fuzzy indexes."""
+        for contact in contacts:
+            self._search_index.add(contact)
+            self._fuzzy_index.add(contact)
+
+    def _deferrable_groups(self):
+        """Return the index groups restored contacts can wait for: all but the name indexes of a sorted book."""
+        return INDEX_GROUPS if self._sorted_by is None else tuple(set(INDEX_GROUPS) - {'names'})
+
+    def _build_indexes(self, *groups):
+        """Materialize a pending file, then add the pending contacts of the given index groups (all by default).
+
+        Restored contacts skip the indexes, so a large file loads quickly and
+        the first operation that needs an index pays for building it. The
+        lock keeps concurrent first readers from indexing a contact twice or
+        reading a half-built index.
+        """
+        self._materialize()
+        groups = groups or INDEX_GROUPS
+        if any(self._unindexed[group] for group in groups):
+            with self._index_lock:
+                for group in groups:
+                    contacts = self._unindexed[group]
+                    if contacts:
+                        getattr(self, f'_index_{group}')(contacts)
+                        self._unindexed[group] = []
+
+    def _materialize(self):
+        """Insert every record of a pending restored file into the book and close the file."""
+        if self._pending is None:
+            return
+        with self._index_lock:
+            pending = self._pending
+            if pending is None:
+                return
+            contacts = [pending[index] for index in range(len(pending))]
+            self._pending = None
+            self._insert_contacts(contacts, self._deferrable_groups(),
+                                  range(pending.start, pending.start + len(pending)))
+        pending.file.close()
+
+    def _sorted_indexes(self):
+        """Return the name and date indexes."""
+        return list(self._name_indexes.values()) + list(self._date_indexes.values())
+
+    def _unindex_contact(self, contact):
+        """Remove a contact from every index; all of them must be built."""
+        for index in self._sorted_indexes():
+            index.remove(contact)
+        self._unindex_unsorted(contact)
+
+    def _unindex_unsorted(self, contact):
+        """Remove a contact from every index except the sorted name and date indexes."""
+        self._search_index.remove(contact)
+        self._fuzzy_index.remove(contact)
+        for field in NAME_FIELDS:
+            initial = self._initial(contact, field)
+            group = self._initial_groups[field].get(initial)
+            if group is not None:
+                group.pop(contact, None)
+                if not group:
+                    del self._initial_groups[field][initial]
+        digits = self._phone_digits(contact.phone_number)
+        bucket = self._phone_index.get(digits)
+        if bucket is not None:
+            bucket.remove(contact)
+            if not bucket:
+                del self._phone_index[digits]
+        key = self._exact_key(contact.first_name, contact.last_name, contact.phone_number)
+        bucket = self._exact_index.get(key)
+        if bucket is not None:
+            bucket.remove(contact)
+            if not bucket:
+                del self._exact_index[key]
+        if contact.email:
+            email = contact.email.lower()
+            bucket = self._email_index.get(email)
+            if bucket is not None:
+                bucket.pop(contact, None)
+                if not bucket:
+                    del self._email_index[email]
+
+    def _insert_contacts(self, contacts, deferred=(), positions=None):
+        """Append a batch of contacts, merging them into the sorted indexes in one pass.
+
+        The index groups in deferred are left for _build_indexes to fill on
+        first use. positions gives the book positions of the contacts; by
+        default they take the next ones. Returns the contacts as a list.
+        """
+        self._materialize()
+        contacts = list(contacts)
+        if positions is None:
+            positions = range(self._next_position, self._next_position + len(contacts))
+        order = self._order
+        for contact, position in zip(contacts, positions):
+            order[contact] = position
+            if position >= self._next_position:
+                self._contacts.append(contact)
+                self._next_position = position + 1
+            else:
+                # An earlier position, such as that of a contact moved in from another shard
+                insort(self._contacts, contact, key=order.__getitem__)
+        self._index_contacts(contacts, deferred)
+        self._generation += 1
+        return contacts
+
+    def _remove_contact(self, contact):
+        """Remove a contact from the book and its indexes without logging."""
+        self._build_indexes()
+        self._contacts.remove(contact)
+        del self._order[contact]
+        self._unindex_contact(contact)
+        self._generation += 1
+
+    def _remove_contacts(self, contacts):
+        """Remove a set of contacts from the book and its indexes with a single pass over each list."""
+        self._build_indexes()
+        for contact in contacts:
+            del self._order[contact]
+            self._unindex_unsorted(contact)
+        for index in self._sorted_indexes():
+            index.remove_many(contacts)
+        self._contacts = [contact for contact in self._contacts if contact not in contacts]
+        self._generation += 1
+
+    def _set_contact_fields(self, contact, first_name, last_name, phone_number, email, address, updated_at):
+        """Change a contact's details while keeping the indexes in sync."""
+        self._build_indexes()
+        self._unindex_contact(contact)
+        contact.updated_at = updated_at
+        contact.first_name = first_name
+        contact.last_name = last_name
+        contact.phone_number = phone_number
+        contact.email = email
+        contact.address = address
+        self._index_contacts([contact])
+        self._generation += 1
+
+    @timed
+    def add_contact(self, contact, position=None):
+        """Add a new contact to the phone book.
+
+        position places it in book order, as a ShardedPhoneBook does with
+        the positions it numbers contacts with; by default it goes last.
+        """
+        self._insert_contacts([contact], positions=None if position is None else [position])
+        contact.update_history(ADDED)
+        logger.info("Added contact: %s %s, %s, %s, %s", contact.first_name, contact.last_name,
+                    contact.phone_number, contact.email, contact.address)
+        if self.journal is not None:
+            self.journal.record_add(self, contact)
+
+    @timed
+    def add_contacts(self, contacts, positions=None):
+        """Add many contacts at once, writing a single log line for the batch.
+
+        positions gives their places in book order, as in add_contact.
+        """
+        return len(self._add_contacts(contacts, positions))
+
+    def _add_contacts(self, contacts, positions=None):
+        """Add many contacts at once and return them as a list."""
+        contacts = self._insert_contacts(contacts, positions=positions)
+        for contact in contacts:
+            contact.update_history(ADDED)
+        if self.journal is not None:
+            self.journal.record_adds(self, contacts)
+        logger.info("Added %d contacts in batch", len(contacts))
+        return contacts
+
+    @property
+    def contacts(self):
+        """Return a list of the contacts in book order.
+
+        Book order is the order contacts were added in until the book is
+        sorted, and name order from then on: the list is then read from the
+        name index.
+        """
+        if self._sorted_by is None:
+            self._materialize()
+            return list(self._contacts)
+        return list(self._name_indexes[self._sorted_by])
+
+    def __len__(self):
+        """Return the number of contacts, without materializing a restored file."""
+        return len(self._contacts) + (len(self._pending) if self._pending is not None else 0)
+
+    def restore_contacts(self, contacts, positions=None):
+        """Insert previously saved contacts without recording history or logging each one.
+
+        Each index is built for them the first time it is used, so loading a
+        large file does not pay for the indexes up front. They are written
+        to the journal when one is attached, so recovery keeps them.
+        positions gives their places in book order, as in add_contact.
+        """
+        contacts = self._insert_contacts(contacts, self._deferrable_groups(), positions)
+        if self.journal is not None:
+            self.journal.record_adds(self, contacts)
+
+    def restore_file(self, contact_file):
+        """Restore the contacts of an open ContactFile, which the phone book then owns and closes.
+
+        Nothing is decoded up front: the file stays mapped as the backing
+        store of its records, which are materialized when read, until an
+        operation needs all of them. With a journal attached, or in a sorted
+        book, the contacts are restored at once instead.
+        """
+        if self.journal is not None or self._sorted_by is not None:
+            with contact_file:
+                self.restore_contacts(contact_file)
+            return
+        self._materialize()
+        # Nothing is inserted while the file is pending, so its records take the next positions
+        self._pending = _PendingContacts(contact_file, self._next_position)
+        self._generation += 1
+
+    def to_columnar(self):
+        """Return a compact columnar copy of the contacts, in book order."""
+        return ColumnarContactStore(self.contacts)
+
+    @timed
+    def save_to_file(self, file_path):
+        """Save all contacts to a binary phone book file."""
+        write_contacts(self.contacts, file_path)
+        logger.info("Saved %d contacts to %s", len(self.contacts), file_path)
+
+    @timed
+    def load_from_file(self, file_path):
+        """Load the contacts of a binary phone book file into the phone book.
+
+        The file is mapped rather than read, as in restore_file, so loading
+        takes the same short time however large it is.
+        """
+        contact_file = ContactFile(file_path)
+        count = len(contact_file)
+        self.restore_file(contact_file)
+        logger.info("Loaded %d contacts from %s", count, file_path)
+        return count
+
+    def view_contacts(self, offset=0, limit=None):
+        """Display the contacts in the phone book, or one page of them with offset and limit."""
+        if not len(self):
             print("No contacts found.")
-        for contact in self.contacts:
+        for contact in self.iter_contacts(offset, limit):
             print(contact)
 
+    def order_key(self, contact, by=None):
+        """Return the key that orders a contact in book order, or among results ordered by a name or date field.
+
+        Keys of different contacts compare in the order the phone book lists
+        them, which lets the shards of a ShardedPhoneBook merge their results.
+        """
+        if by is None:
+            return self._book_key(contact)
+        if by in self._name_indexes:
+            self._build_indexes('names')
+            return self._name_indexes[by].sort_key(contact)
+        self._build_indexes('dates')
+        return self._date_indexes[by].sort_key(contact)
+
+    def contact_cursor(self, contact, by=None):
+        """Return a cursor for the position of a contact in book order, to resume iteration after it.
+
+        With by='created_at' or 'updated_at' the cursor is for the contact's
+        place in chronological order instead, for iter_contacts_by_date.
+        A book order cursor only holds until the book is sorted by another
+        name, after which iter_contacts raises ValueError for it.
+        """
+        if by is None:
+            return self._sorts, self._book_key(contact)
+        self._build_indexes('dates')
+        return by, self._date_indexes[by].sort_key(contact)
+
+    def _cursor_key(self, after, order):
+        """Return the sort key of a cursor from contact_cursor, checking that it is for the given order."""
+        if after is None:
+            return None
+        cursor_order, key = after
+        if cursor_order != order:
+            if isinstance(order, int) and isinstance(cursor_order, int):
+                raise ValueError("Cursor is from before the phone book was last sorted")
+            expected = 'book order' if isinstance(order, int) else f"{order} order"
+            raise ValueError(f"Cursor is not for {expected}")
+        return key
+
+    def iter_contacts(self, offset=0, limit=None, after=None):
+        """Yield contacts in book order, skipping offset and stopping after limit.
+
+        after is a cursor from contact_cursor; iteration then starts with the
+        contact following that one, even if it has since been deleted. The
+        phone book must not be modified while iterating.
+        """
+        after = self._cursor_key(after, self._sorts)
+        if self._sorted_by is not None:
+            return self._name_indexes[self._sorted_by].ipage(offset, limit, after)
+        if self._pending is not None:
+            return self._iter_pending(offset, limit, after)
+        start = 0
+        if after is not None:
+            start = bisect_right(self._contacts, after, key=self._order.__getitem__)
+        stop = None if limit is None else start + offset + limit
+        return islice(self._contacts, start + offset, stop)
+
+    def _iter_pending(self, offset, limit, after):
+        """Yield a page of book order while a restored file is pending, materializing only the records on it."""
+        contacts = self._contacts
+        pending = self._pending
+        start = 0
+        if after is not None:
+            start = bisect_right(contacts, after, key=self._order.__getitem__)
+            if after >= pending.start:
+                start += min(after - pending.start + 1, len(pending))
+        total = len(contacts) + len(pending)
+        stop = total if limit is None else min(total, start + offset + limit)
+        for index in range(start + offset, stop):
+            if index < len(contacts):
+                yield contacts[index]
+            else:
+                contact = pending[index - len(contacts)]
+                # Registered now so that contact_cursor works before the file is materialized
+                self._order[contact] = pending.start + index - len(contacts)
+                yield contact
+
+    def iter_search_contacts(self, query, offset=0, limit=None, after=None):
+        """Yield contacts matching a search in book order, with the same offset, limit and cursor as iter_contacts.
+
+        With a limit only the first offset + limit matches are ordered, so a
+        page of a large result does not sort or copy the rest of it.
+        """
+        after = self._cursor_key(after, self._sorts)
+        self._build_indexes('text')
+        matches = self._search_index.search(query)
+        if after is not None:
+            matches = [contact for contact in matches if self._book_key(contact) > after]
+        if limit is None:
+            page = sorted(matches, key=self._book_key)[offset:]
+        else:
+            page = heapq.nsmallest(offset + limit, matches, key=self._book_key)[offset:]
+        audit.log_search("Searched for: %s, found %d results", query, len(matches))
+        yield from page
+
+    def operation_stats(self):
+        """Return the call count and total, mean and longest time in milliseconds of each timed operation."""
+        return self._timings.stats()
+
+    def reset_operation_stats(self):
+        """Clear the operation timing counters."""
+        self._timings.reset()
+
+    def cache_stats(self):
+        """Return hit and miss statistics of the query result cache."""
+        return self._cache.stats()
+
+    def _cached(self, key, compute):
+        """Return the cached result for key, computing and caching it if missing or stale."""
+        result = self._cache.get(key, self._generation)
+        if result is None:
+            result = compute()
+            self._cache.put(key, self._generation, result)
+        return result
+
+    @timed
     def search_contacts(self, query):
         """Search for contacts by name or phone number."""
-        results = [contact for contact in self.contacts if query.lower() in contact.first_name.lower() or query.lower() in contact.last_name.lower() or query in contact.phone_number]
-        logging.info(f"Searched for: {query}, found {len(results)} results")
+        self._build_indexes('text')
+        results = self._cached(('search', query),
+                               lambda: sorted(self._search_index.search(query), key=self._book_key))
+        audit.log_search("Searched for: %s, found %d results", query, len(results))
         return results
 
+    @timed
+    def fuzzy_search_contacts(self, query, max_distance=2, limit=10, with_scores=False):
+        """Search for contacts whose names are close to the query in spelling or sound.
+
+        Each word of the query must be within max_distance edits of a word of
+        the contact's first or last name, or share its Soundex code. The best
+        limit matches are returned, closest first; with_scores=True returns
+        (score, contact) pairs, lower scores closer, so that ranked results
+        can be merged.
+        """
+        self._build_indexes('text')
+        ranked = self._fuzzy_index.search(query, max_distance, limit)
+        audit.log_search("Fuzzy searched for: %s, found %d results", query, len(ranked))
+        if with_scores:
+            return ranked
+        return [contact for _, contact in ranked]
+
+    @timed
     def find_exact_contact(self, first_name, last_name, phone_number):
         """Find a contact by exact first name, last name, and phone number."""
-        for contact in self.contacts:
-            if (contact.first_name.lower() == first_name.lower() and
-                contact.last_name.lower() == last_name.lower() and
-                contact.phone_number == phone_number):
-                return contact
+        self._build_indexes('exact')
+        bucket = self._exact_index.get(self._exact_key(first_name, last_name, phone_number))
+        if bucket:
+            return bucket[0]
         return None
 
+    def find_exact_contacts(self, first_name, last_name, phone_number):
+        """Find every contact with exactly this first name, last name, and phone number."""
+        self._build_indexes('exact')
+        return list(self._exact_index.get(self._exact_key(first_name, last_name, phone_number), []))
+
+    def find_contacts_by_phone(self, phone_number):
+        """Find all contacts whose phone number has the same digits."""
+        self._build_indexes('phones')
+        return list(self._phone_index.get(self._phone_digits(phone_number), []))
+
+    def has_contact(self, first_name, last_name, phone_number):
+        """Check whether a contact with these exact details already exists."""
+        self._build_indexes('exact')
+        return self._exact_key(first_name, last_name, phone_number) in self._exact_index
+
+    def move_out(self, first_name, last_name, phone_number, new_contact):
+        """Update a contact, then take it out of the phone book and return (position, contact).
+
+        Returns None when no contact has these exact details. With move_in
+        on another phone book this moves a contact between the shards of a
+        ShardedPhoneBook, keeping its history and its place in book order.
+        """
+        contact = self.find_exact_contact(first_name, last_name, phone_number)
+        if contact is None or not self.update_contact(first_name, last_name, phone_number, new_contact):
+            return None
+        position = self._order[contact]
+        self._remove_contacts({contact: None})
+        if self.journal is not None:
+            self.journal.record_deletes(self, {contact: None})
+        return position, contact
+
+    def move_in(self, contact, position):
+        """Insert a contact taken out of another phone book by move_out at its position in book order."""
+        self.restore_contacts([contact], [position])
+
+    @timed
     def update_contact(self, first_name, last_name, phone_number, new_contact):
         """Update an existing contact's information."""
         contact = self.find_exact_contact(first_name, last_name, phone_number)
         if contact:
-            contact.first_name = new_contact.first_name
-            contact.last_name = new_contact.last_name
-            contact.phone_number = new_contact.phone_number
-            contact.email = new_contact.email
-            contact.address = new_contact.address
-            contact.update_history(f"Updated contact from {contact}")
-            logging.info(f"Updated contact: {contact} to {new_contact}")
+            old_key = (contact.first_name, contact.last_name, contact.phone_number)
+            previous = str(contact)
+            self._set_contact_fields(contact, new_contact.first_name, new_contact.last_name,
+                                     new_contact.phone_number, new_contact.email, new_contact.address,
+                                     datetime.now())
+            contact.update_history(UPDATED, previous)
+            logger.info("Updated contact: %s to %s %s, %s, %s, %s", previous, contact.first_name,
+                        contact.last_name, contact.phone_number, contact.email, contact.address)
+            if self.journal is not None:
+                self.journal.record_update(self, old_key, contact)
             return True
-        logging.warning(f"Exact contact to update not found for: {first_name} {last_name} {phone_number}")
+        logger.warning("Exact contact to update not found for: %s %s %s", first_name, last_name, phone_number)
         return False
 
+    def _delete_matches(self, matches):
+        """Delete an insertion-ordered dict of contacts, recording history and journal entries."""
+        self._remove_contacts(matches)
+        for contact in matches:
+            contact.update_history(DELETED)
+        if self.journal is not None:
+            self.journal.record_deletes(self, matches)
+
+    @timed
     def delete_contact(self, query):
         """Delete a contact matching the query."""
         results = self.search_contacts(query)
         if results:
+            self._delete_matches(dict.fromkeys(results))
             for contact in results:
-                self.contacts.remove(contact)
-                contact.update_history("Deleted contact")
-                logging.info(f"Deleted contact: {contact}")
+                logger.info("Deleted contact: %s %s, %s, %s, %s", contact.first_name, contact.last_name,
+                            contact.phone_number, contact.email, contact.address)
             return True
-        logging.warning(f"Contact to delete not found for query: {query}")
+        logger.warning("Contact to delete not found for query: %s", query)
         return False
 
+    @timed
     def delete_contacts_batch(self, queries):
-        
+        """Delete every contact matching any of the queries and return the number deleted per query.
+
+        All queries are resolved through the search index first and the book
+        is compacted once, instead of rescanning it for every query. A contact
+        matched by several queries is counted for the first one, as if the
+        queries had been applied one after another.
+        """
+        self._build_indexes('text')
+        matches = {}
+        counts = {}
         for query in queries:
-            self.delete_contact(query)
+            found = 0
+            for contact in self._search_index.search(query):
+                if contact not in matches:
+                    matches[contact] = None
+                    found += 1
+            counts[query] = counts.get(query, 0) + found
+        if matches:
+            self._delete_matches(matches)
+        logger.info("Batch deleted %d contacts for %d queries", len(matches), len(counts))
+        return counts
 
+    @timed
     def import_contacts_from_csv(self, file_path):
         """Import contacts from a CSV file."""
         try:
             with open(file_path, mode='r') as file:
                 reader = csv.DictReader(file)
-                headers = reader.fieldnames
-
-                # Map related headers to expected fields
-                header_mapping = {
-                    'First Name': ['First Name', 'FirstName', 'first_name', 'firstname'],
-                    'Last Name': ['Last Name', 'LastName', 'last_name', 'lastname'],
-                    'Phone Number': ['Phone Number', 'PhoneNumber', 'phone_number', 'phonenumber'],
-                    'Email': ['Email', 'Email Address', 'email', 'email_address'],
-                    'Address': ['Address', 'address', 'Address (Optional)', 'address_optional']
-                }
-
-                def get_mapped_header(expected_header):
-                    for header in header_mapping[expected_header]:
-                        if header in headers:
-                            return header
-                    return None
-
-                first_name_header = get_mapped_header('First Name')
-                last_name_header = get_mapped_header('Last Name')
-                phone_number_header = get_mapped_header('Phone Number')
-                email_header = get_mapped_header('Email')
-                address_header = get_mapped_header('Address')
+                mapped = map_headers(reader.fieldnames)
+
+                first_name_header = mapped['First Name']
+                last_name_header = mapped['Last Name']
+                phone_number_header = mapped['Phone Number']
+                email_header = mapped['Email']
+                address_header = mapped['Address']
 
                 if not first_name_header or not last_name_header or not phone_number_header:
                     print("CSV file is missing mandatory headers. Please ensure it includes First Name, Last Name, and Phone Number.")
@@ -114,50 +683,206 @@ class PhoneBook:
                         contact = Contact(first_name, last_name, phone_number, email, address)
                         self.add_contact(contact)
                     except ValueError as e:
-                        logging.error(f"Error adding contact from row {row}: {e}")
+                        logger.error("Error adding contact from row %s: %s", row, e)
                         print(f"Error adding contact from row {row}: {e}")
         except FileNotFoundError:
             print("CSV file not found. Please check the file path and try again.")
-            logging.error("CSV file not found.")
+            logger.error("CSV file not found.")
+
+    def _export(self, file_path, file_format, query, start_date, end_date, by, chunk_size, workers):
+        """Write the selected contacts to an export file and return how many were written."""
+        contacts = select_contacts(self, query, start_date, end_date, by)
+        count = write_export(contacts, file_path, file_format, chunk_size, workers)
+        logger.info("Exported %d contacts to %s", count, file_path)
+        return count
+
+    def export_contacts_to_csv(self, file_path, query=None, start_date=None, end_date=None, by='created_at',
+                               chunk_size=10000, workers=0):
+        """Export contacts to a CSV file with the importer's headers and return how many were written.
+
+        query and the start_date/end_date range (on created_at or updated_at)
+        select contacts as search_contacts and filter_contacts_by_date do.
+        Rows are serialized in chunks of chunk_size, on workers processes
+        when workers is not 0 (all cores when None).
+        """
+        return self._export(file_path, 'csv', query, start_date, end_date, by, chunk_size, workers)
+
+    def export_contacts_to_jsonl(self, file_path, query=None, start_date=None, end_date=None, by='created_at',
+                                 chunk_size=10000, workers=0):
+        """Export contacts to a JSON Lines file, with the same selection as export_contacts_to_csv."""
+        return self._export(file_path, 'jsonl', query, start_date, end_date, by, chunk_size, workers)
 
+    def _merge_duplicates(self, candidates):
+        """Merge each duplicate cluster among the candidates into one contact; return how many were removed."""
+        removed = {}
+        now = datetime.now()
+        for cluster in find_duplicate_clusters(candidates):
+            survivor, others, email, address, history = merge_cluster(cluster)
+            old_key = (survivor.first_name, survivor.last_name, survivor.phone_number)
+            self._set_contact_fields(survivor, survivor.first_name, survivor.last_name, survivor.phone_number,
+                                     email, address, now)
+            survivor.history = history
+            survivor.update_history(MERGED, '; '.join(str(contact) for contact in others))
+            if self.journal is not None:
+                self.journal.record_update(self, old_key, survivor)
+            for contact in others:
+                removed[contact] = None
+        if removed:
+            self._remove_contacts(removed)
+            if self.journal is not None:
+                self.journal.record_deletes(self, removed)
+        return len(removed)
+
+    @timed
+    def deduplicate_contacts(self, contacts=None):
+        """Merge duplicate contacts across the whole phone book and return how many were removed.
+
+        Contacts sharing a phone number with names at most one typo apart, or
+        sharing a name and an email, are merged into the earliest created one.
+        Given contacts, such as a freshly imported batch, only their
+        duplicates are merged.
+        """
+        candidates = self.contacts if contacts is None else self._duplicate_candidates(contacts)
+        removed = self._merge_duplicates(candidates)
+        logger.info("Merged duplicates, removed %d contacts", removed)
+        return removed
+
+    def _duplicate_candidates(self, contacts):
+        """Return the given contacts plus existing ones sharing a phone number or email, in book order."""
+        self._build_indexes('phones', 'emails')
+        candidates = dict.fromkeys(contacts)
+        for contact in contacts:
+            candidates.update(dict.fromkeys(self._phone_index.get(self._phone_digits(contact.phone_number), ())))
+            if contact.email:
+                candidates.update(self._email_index.get(contact.email.lower(), {}))
+        return sorted(candidates, key=self._book_key)
+
+    @timed
+    def bulk_import_contacts_from_csv(self, file_path, chunk_size=10000, workers=None, dedupe=False):
+        """Import a large CSV file in chunks, validating rows in a process pool.
+
+        Rows are streamed, so memory does not grow with the file size. Returns an
+        ImportReport with the number of imported contacts and the rejected rows
+        instead of printing errors. With dedupe=True each chunk is merged with
+        any duplicates already in the phone book as it is inserted.
+        """
+        report = ImportReport(file_path)
+        try:
+            for contacts, rejected in iter_validated_chunks(file_path, report, chunk_size, workers):
+                added = self._add_contacts(contacts)
+                report.imported += len(added)
+                report.rejected.extend(rejected)
+                if dedupe:
+                    report.merged += self._merge_duplicates(self._duplicate_candidates(added))
+        except FileNotFoundError:
+            report.error = "CSV file not found"
+        if report.ok:
+            logger.info("%s", report)
+        else:
+            logger.error("%s", report)
+        return report
+
+    @timed
     def sort_contacts(self, by='first_name'):
-        """Sort contacts by first or last name."""
-        if by == 'first_name':
-            self.contacts.sort(key=lambda contact: contact.first_name.lower())
-        elif by == 'last_name':
-            self.contacts.sort(key=lambda contact: contact.last_name.lower())
-        logging.info(f"Sorted contacts by {by}")
+        """Sort contacts by first or last name.
+
+        Book order becomes a view of the name index, so contacts added or
+        changed later take their place in it and sorting again by the same
+        name does nothing. Like list.sort the sort is stable: contacts with
+        the same name keep their current order, so sorting by last name and
+        then by first name orders by first name, then last name.
+        """
+        if by in self._name_indexes and by != self._sorted_by:
+            self._build_indexes('names')
+            if self._sorted_by is not None and by not in self._chained_names:
+                # Ties broken by the other name first keep the order of a book sorted by it
+                self._name_indexes[by].chain(self._name_key(NAME_FIELDS[by == 'first_name']))
+                self._chained_names.add(by)
+            self._sorted_by = by
+            self._book_key = self._name_indexes[by].sort_key
+            self._sorts += 1
+            self._generation += 1
+        logger.info("Sorted contacts by %s", by)
 
+    @timed
     def group_contacts_by_initial(self, by='last_name'):
-        """Group contacts by the first letter of their name."""
-        grouped_contacts = {}
-        for contact in self.contacts:
-            if by == 'first_name':
-                initial = contact.first_name[0].upper()
-            else:
-                initial = contact.last_name[0].upper()
-            if initial not in grouped_contacts:
-                grouped_contacts[initial] = []
-            grouped_contacts[initial].append(contact)
-        logging.info(f"Grouped contacts by initial letter of {by}")
+        """Group contacts by the first letter of their name, in alphabetical order of the letters.
+
+        Each group lists its contacts in book order, so groups of a sorted
+        book are sorted too.
+        """
+        self._build_indexes('names')
+        groups = self._initial_groups['first_name' if by == 'first_name' else 'last_name']
+        grouped_contacts = self._cached(('group', by),
+                                        lambda: {initial: sorted(groups[initial], key=self._book_key)
+                                                 for initial in sorted(groups)})
+        logger.info("Grouped contacts by initial letter of %s", by)
         return grouped_contacts
 
+    def sorted_contacts(self, by='first_name'):
+        """Return contacts ordered by first or last name without reordering the phone book."""
+        self._build_indexes('names')
+        return list(self._name_indexes[by])
+
+    @timed
+    def contacts_in_range(self, start, end, by='last_name', page=1, page_size=20):
+        """Return one page of contacts whose name falls from start to end, in name order.
+
+        Both bounds are prefixes and case-insensitive, so start='M', end='N'
+        covers every name beginning with M or N. Pages are numbered from 1.
+        """
+        self._build_indexes('names')
+        offset = (page - 1) * page_size
+        return self._name_indexes[by].range(start.lower(), end.lower() + '\U0010ffff', offset, page_size)
+
+    def count_contacts_in_range(self, start, end, by='last_name'):
+        """Return how many contacts have a name from start to end, using the same bounds as contacts_in_range."""
+        self._build_indexes('names')
+        return self._name_indexes[by].count_range(start.lower(), end.lower() + '\U0010ffff')
+
     def view_contact_history(self, contact):
         """Display the history of actions for a contact."""
         print(f"History for {contact.first_name} {contact.last_name}:")
-        for entry in contact.history:
+        for entry in contact.formatted_history():
             print(entry)
 
-    def filter_contacts_by_date(self, start_date, end_date):
-        """Filter contacts created within a specified date range."""
-        results = [contact for contact in self.contacts if start_date <= contact.created_at <= end_date]
-        logging.info(f"Filtered contacts from {start_date} to {end_date}, found {len(results)} results")
+    @timed
+    def filter_contacts_by_date(self, start_date, end_date, by='created_at', count_only=False):
+        """Filter contacts created (or, with by='updated_at', last updated) within a date range.
+
+        Results come from a sorted date index in chronological order, contacts
+        with the same time in the order they were added. With
+        count_only=True only the number of matching contacts is returned.
+        """
+        self._build_indexes('dates')
+        if count_only:
+            count = self._cached(('count_dates', by, start_date, end_date),
+                                 lambda: self._date_indexes[by].count_range(start_date, end_date))
+            logger.info("Counted contacts by %s from %s to %s, found %d results", by, start_date, end_date, count)
+            return count
+        results = self._cached(('dates', by, start_date, end_date),
+                               lambda: self._date_indexes[by].range(start_date, end_date))
+        logger.info("Filtered contacts by %s from %s to %s, found %d results", by, start_date, end_date, len(results))
         return results
 
+    def iter_contacts_by_date(self, start_date, end_date, by='created_at', offset=0, limit=None, after=None):
+        """Yield contacts created or last updated within a date range, in chronological order.
+
+        Nothing is materialized, which suits large ranges such as incremental
+        exports of everything updated since the last sync. offset and limit
+        select one page of the range, and after, a cursor from
+        contact_cursor(contact, by), resumes it after that contact. The phone
+        book must not be modified while iterating.
+        """
+        after = self._cursor_key(after, by)
+        self._build_indexes('dates')
+        logger.info("Streaming contacts by %s from %s to %s", by, start_date, end_date)
+        return self._date_indexes[by].irange(start_date, end_date, offset, limit, after)
+
     def validate_date(self, date_str):
         try:
             return datetime.strptime(date_str, '%Y-%m-%d')
         except ValueError:
             print(f"Invalid date format: {date_str}. Please use YYYY-MM-DD.")
-            logging.error(f"Invalid date format: {date_str}")
+            logger.error("Invalid date format: %s", date_str)
             return None
\ No newline at end of file
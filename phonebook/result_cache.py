@@ -0,0 +1,105 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(result):
+    """Return the approximate bytes held by a cached result.
+
+    Contacts are shared with the phone book, so only the containers and
+    their references are counted, not the contacts themselves.
+    """
+    size = sys.getsizeof(result)
+    if isinstance(result, dict):
+        size += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in result.items())
+    return size
+
+
+def copy_result(result):
+    """Return a copy of a result that can be changed without affecting the cached one."""
+    if isinstance(result, list):
+        return list(result)
+    if isinstance(result, dict):
+        return {key: list(value) for key, value in result.items()}
+    return result
+
+
+class ResultCache:
+    """
+    A least-recently-used cache of query results bounded by entries and bytes.
+
+    Each entry remembers the phone book generation it was computed at and is
+    dropped instead of returned once the generation has moved on, so a result
+    is never served after a mutation. Lookups reorder and evict entries, so
+    every method holds a lock: concurrent readers, such as the HTTP service's
+    worker threads, share one cache safely.
+    """
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        """Initialize an empty cache; max_entries=0 disables caching."""
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, generation):
+        """Return a copy of the result cached for key at this generation, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != generation:
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = entry[1]
+        return copy_result(result)
+
+    def put(self, key, generation, result):
+        """Cache a copy of result for key, evicting the least recently used entries to stay in bounds."""
+        if not self.max_entries:
+            return
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+        result = copy_result(result)
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (generation, result, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _discard(self, key):
+        """Remove an entry if present; the caller holds the lock."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def clear(self):
+        """Remove every entry, keeping the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return the hit and miss counts, hit rate, entry count and approximate size in bytes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
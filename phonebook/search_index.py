@@ -0,0 +1,116 @@
+import sys
+
+
+class SubstringScanIndex:
+    """
+    A search index that answers queries by scanning every contact.
+
+    Search indexes used by PhoneBook provide add(contact), remove(contact) and
+    search(query); search returns the set of contacts whose first or last name
+    contains the query (case-insensitive) or whose phone number contains it.
+    """
+    def __init__(self):
+        """Initialize an empty scan index."""
+        self._texts = {}
+
+    @staticmethod
+    def _index_texts(contact):
+        """Return the lowercased first name, last name and the phone number of a contact."""
+        return (sys.intern(contact.first_name.lower()), sys.intern(contact.last_name.lower()), contact.phone_number)
+
+    def add(self, contact):
+        """Add a contact to the index."""
+        self._texts[contact] = self._index_texts(contact)
+
+    def remove(self, contact):
+        """Remove a contact from the index."""
+        self._texts.pop(contact, None)
+
+    def __len__(self):
+        """Return the number of indexed contacts."""
+        return len(self._texts)
+
+    def _scan(self, query, candidates):
+        """Return the candidates whose indexed texts contain the lowercased query."""
+        texts = self._texts
+        matches = set()
+        for contact in candidates:
+            first_name, last_name, phone_number = texts[contact]
+            if query in first_name or query in last_name or query in phone_number:
+                matches.add(contact)
+        return matches
+
+    def search(self, query):
+        """Return the set of contacts matching the query."""
+        return self._scan(query.lower(), self._texts)
+
+
+class TrigramIndex(SubstringScanIndex):
+    """
+    An inverted index from three-character substrings to contacts.
+
+    A contact can only contain the query if it contains every trigram of the
+    query, so intersecting the posting sets of the query's trigrams gives a
+    small candidate set that is then checked with the plain substring test.
+    Queries shorter than three characters fall back to a scan.
+    """
+    def __init__(self):
+        """Initialize an empty trigram index."""
+        super().__init__()
+        self._postings = {}
+
+    @staticmethod
+    def _trigrams(text):
+        """Return the set of trigrams in a string."""
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def _contact_trigrams(self, texts):
+        """Return the trigrams of all indexed texts of a contact."""
+        grams = set()
+        for text in texts:
+            grams |= self._trigrams(text)
+        return grams
+
+    def add(self, contact):
+        """Add a contact to the index."""
+        texts = self._index_texts(contact)
+        self._texts[contact] = texts
+        postings = self._postings
+        for gram in self._contact_trigrams(texts):
+            bucket = postings.get(gram)
+            if bucket is None:
+                postings[gram] = {contact}
+            else:
+                bucket.add(contact)
+
+    def remove(self, contact):
+        """Remove a contact from the index."""
+        texts = self._texts.pop(contact, None)
+        if texts is None:
+            return
+        postings = self._postings
+        for gram in self._contact_trigrams(texts):
+            bucket = postings.get(gram)
+            if bucket is not None:
+                bucket.discard(contact)
+                if not bucket:
+                    del postings[gram]
+
+    def search(self, query):
+        """Return the set of contacts matching the query."""
+        query = query.lower()
+        if len(query) < 3:
+            return self._scan(query, self._texts)
+        buckets = []
+        for gram in self._trigrams(query):
+            bucket = self._postings.get(gram)
+            if not bucket:
+                return set()
+            buckets.append(bucket)
+        buckets.sort(key=len)
+        candidates = buckets[0]
+        for bucket in buckets[1:]:
+            candidates = candidates & bucket
+            if not candidates:
+                return set()
+        return self._scan(query, candidates)
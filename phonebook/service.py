@@ -0,0 +1,322 @@
+import argparse
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+from audit import logger
+from contact import Contact
+from journal import recover_phonebook
+
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+MAX_BODY = 1024 * 1024
+
+
+class HTTPError(Exception):
+    """Raised by request handlers to send an error status with a message."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ReadWriteLock:
+    """
+    An asyncio lock that admits many readers or a single writer.
+
+    A waiting writer stops new readers from entering, so a steady stream of
+    searches cannot starve updates.
+    """
+    def __init__(self):
+        """Initialize an unlocked lock."""
+        self._condition = asyncio.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @asynccontextmanager
+    async def read(self):
+        """Hold the lock shared for the duration of the block."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self._writer and not self._writers_waiting)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @asynccontextmanager
+    async def write(self):
+        """Hold the lock exclusively for the duration of the block."""
+        async with self._condition:
+            self._writers_waiting += 1
+            try:
+                await self._condition.wait_for(lambda: not self._writer and not self._readers)
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+def contact_to_json(contact):
+    """Return a JSON-serializable dict describing a contact."""
+    return {
+        'first_name': contact.first_name,
+        'last_name': contact.last_name,
+        'phone_number': contact.phone_number,
+        'email': contact.email,
+        'address': contact.address,
+        'created_at': contact.created_at.isoformat(),
+        'updated_at': contact.updated_at.isoformat(),
+    }
+
+
+def contact_from_json(data):
+    """Build and validate a Contact from a request body."""
+    if not isinstance(data, dict):
+        raise HTTPError(400, "Expected a JSON object describing the contact")
+    try:
+        first_name = data['first_name'].strip()
+        last_name = data['last_name'].strip()
+        phone_number = data['phone_number']
+    except (KeyError, AttributeError):
+        raise HTTPError(400, "first_name, last_name and phone_number are required")
+    if not first_name or not last_name:
+        raise HTTPError(400, "First Name and Last Name are mandatory")
+    try:
+        return Contact(first_name, last_name, phone_number, data.get('email'), data.get('address'))
+    except (ValueError, TypeError) as e:
+        raise HTTPError(400, str(e))
+
+
+async def read_line(reader):
+    """Read one line of a request head, rejecting lines longer than the stream's limit."""
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        raise HTTPError(400, "Request line or header too long")
+
+
+def parse_content_length(value):
+    """Return the body length given by a Content-Length header, 0 when it is absent."""
+    try:
+        length = int(value or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        raise HTTPError(400, "Content-Length must be a non-negative integer")
+    return length
+
+
+def parse_date(value, name):
+    """Parse a YYYY-MM-DD query parameter."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be a date in YYYY-MM-DD format")
+
+
+class PhoneBookService:
+    """
+    Serves a PhoneBook over HTTP/JSON on asyncio.
+
+    Handlers run the phone book calls on a thread pool: reads hold the
+    read-write lock shared, so concurrent searches proceed together, while
+    mutations hold it exclusively.
+    """
+    def __init__(self, phonebook, workers=8):
+        """Wrap a phone book, running its calls on a pool of worker threads."""
+        self.phonebook = phonebook
+        self.lock = ReadWriteLock()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.routes = {
+            ('GET', '/contacts/search'): self.search,
+            ('GET', '/contacts/exact'): self.find_exact,
+            ('GET', '/contacts/by-date'): self.filter_by_date,
+            ('POST', '/contacts'): self.add,
+            ('PUT', '/contacts'): self.update,
+            ('DELETE', '/contacts'): self.delete,
+            ('POST', '/import'): self.import_csv,
+        }
+
+    async def _read(self, function, *args):
+        """Run a read-only phone book call under the shared lock."""
+        async with self.lock.read():
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def _write(self, function, *args):
+        """Run a mutating phone book call under the exclusive lock."""
+        async with self.lock.write():
+            return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def search(self, params, body):
+        """GET /contacts/search?q=QUERY"""
+        results = await self._read(self.phonebook.search_contacts, params.get('q', ''))
+        return 200, [contact_to_json(contact) for contact in results]
+
+    async def find_exact(self, params, body):
+        """GET /contacts/exact?first_name=&last_name=&phone_number="""
+        contact = await self._read(self.phonebook.find_exact_contact, params.get('first_name', ''),
+                                   params.get('last_name', ''), params.get('phone_number', ''))
+        if contact is None:
+            raise HTTPError(404, "Contact not found")
+        return 200, contact_to_json(contact)
+
+    async def filter_by_date(self, params, body):
+        """GET /contacts/by-date?start=YYYY-MM-DD&end=YYYY-MM-DD[&by=updated_at]"""
+        start_date = parse_date(params.get('start'), 'start')
+        end_date = parse_date(params.get('end'), 'end')
+        by = params.get('by', 'created_at')
+        if by not in ('created_at', 'updated_at'):
+            raise HTTPError(400, "by must be created_at or updated_at")
+        results = await self._read(self.phonebook.filter_contacts_by_date, start_date, end_date, by)
+        return 200, [contact_to_json(contact) for contact in results]
+
+    async def add(self, params, body):
+        """POST /contacts with a contact object."""
+        contact = contact_from_json(body)
+        await self._write(self.phonebook.add_contact, contact)
+        return 201, contact_to_json(contact)
+
+    async def update(self, params, body):
+        """PUT /contacts with {"match": {first_name, last_name, phone_number}, "contact": {...}}."""
+        if not isinstance(body, dict) or not isinstance(body.get('match'), dict):
+            raise HTTPError(400, "Expected a match object identifying the contact")
+        match = body['match']
+        new_contact = contact_from_json(body.get('contact'))
+
+        def update():
+            if not self.phonebook.update_contact(match.get('first_name', ''), match.get('last_name', ''),
+                                                 match.get('phone_number', ''), new_contact):
+                return None
+            return self.phonebook.find_exact_contact(new_contact.first_name, new_contact.last_name,
+                                                     new_contact.phone_number)
+
+        contact = await self._write(update)
+        if contact is None:
+            raise HTTPError(404, "Contact not found")
+        return 200, contact_to_json(contact)
+
+    async def delete(self, params, body):
+        """DELETE /contacts?q=QUERY deletes every contact matching the query."""
+        if not params.get('q'):
+            raise HTTPError(400, "q is required")
+        counts = await self._write(self.phonebook.delete_contacts_batch, [params['q']])
+        return 200, {'deleted': counts[params['q']]}
+
+    async def import_csv(self, params, body):
+        """POST /import with {"path": CSV_FILE} imports a CSV file readable by the server."""
+        if not isinstance(body, dict) or not isinstance(body.get('path'), str):
+            raise HTTPError(400, "Expected {\"path\": CSV_FILE}")
+        report = await self._write(self.phonebook.bulk_import_contacts_from_csv, body['path'])
+        if not report.ok:
+            raise HTTPError(400, report.error)
+        return 200, {'imported': report.imported,
+                     'rejected': [{'line': line, 'reason': reason} for line, _, reason in report.rejected]}
+
+    async def dispatch(self, method, target, body):
+        """Route a request and return (status, payload)."""
+        url = urlsplit(target)
+        params = {key: values[-1] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                raise HTTPError(405, f"{method} is not supported on {url.path}")
+            raise HTTPError(404, f"No route for {url.path}")
+        if body:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                raise HTTPError(400, "Request body is not valid JSON")
+        return await handler(params, body)
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until it is closed."""
+        try:
+            while True:
+                try:
+                    request_line = await read_line(reader)
+                    if not request_line:
+                        break
+                    try:
+                        method, target, version = request_line.decode('latin-1').split()
+                    except ValueError:
+                        raise HTTPError(400, "Malformed request line")
+                    headers = {}
+                    while True:
+                        line = await read_line(reader)
+                        if line in (b'\r\n', b'\n', b''):
+                            break
+                        name, _, value = line.decode('latin-1').partition(':')
+                        headers[name.strip().lower()] = value.strip()
+                    length = parse_content_length(headers.get('content-length'))
+                    if length > MAX_BODY:
+                        raise HTTPError(413, "Request body too large")
+                except HTTPError as e:
+                    # The rest of the request cannot be found reliably, so the connection is closed
+                    status, payload = e.status, {'error': str(e)}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    try:
+                        status, payload = await self.dispatch(method, target, body)
+                    except HTTPError as e:
+                        status, payload = e.status, {'error': str(e)}
+                    except Exception:
+                        logger.exception("Error handling %s %s", method, target)
+                        status, payload = 500, {'error': "Internal server error"}
+                    keep_alive = (headers.get('connection', '').lower() != 'close'
+                                  and version != 'HTTP/1.0')
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        """Listen for connections until cancelled."""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving the phone book on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """Run the phone book HTTP service from the command line."""
+    parser = argparse.ArgumentParser(description="Phone book HTTP/JSON service")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on")
+    parser.add_argument('--port', type=int, default=8080, help="port to listen on")
+    parser.add_argument('--data', default='phonebook.dat', help="snapshot file")
+    parser.add_argument('--journal', default='phonebook.wal', help="write-ahead journal file")
+    parser.add_argument('--workers', type=int, default=8, help="threads running phone book calls")
+    args = parser.parse_args()
+
+    phonebook = recover_phonebook(args.journal, args.data)
+    service = PhoneBookService(phonebook, args.workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        phonebook.journal.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+import heapq
+import itertools
+import multiprocessing
+import audit
+from audit import logger
+from columnar import ColumnarContactStore
+from importer import ImportReport, iter_validated_chunks
+from phonebook import PhoneBook
+from result_cache import ResultCache
+from storage import ContactFile, write_contacts
+from timing import OperationTimings
+from validation import phone_digits
+
+RESTORE_BATCH_SIZE = 10000
+
+
+def _keyed(phonebook, by, command, *args):
+    """Run a command returning contacts, or a dict of contact lists, and pair each contact with its order key.
+
+    by is the field the results are ordered by, or None for book order.
+    """
+    result = _run(phonebook, command, args, {})
+    if isinstance(result, dict):
+        return {key: [(phonebook.order_key(contact, by), contact) for contact in contacts]
+                for key, contacts in result.items()}
+    return [(phonebook.order_key(contact, by), contact) for contact in result]
+
+
+def _delete_if_found(phonebook, query):
+    """Delete the contacts matching the query, without logging a warning when the shard has none."""
+    if not phonebook.search_contacts(query):
+        return False
+    return phonebook.delete_contact(query)
+
+
+def _add_chunk(phonebook, contacts, positions, dedupe):
+    """Add an imported chunk at the given book positions and return (added, merged)."""
+    added = phonebook.add_contacts(contacts, positions)
+    merged = phonebook.deduplicate_contacts(contacts) if dedupe else 0
+    return added, merged
+
+
+def _contacts(phonebook):
+    """Return the shard's contacts in book order."""
+    return phonebook.contacts
+
+
+def _page(phonebook, method, *args):
+    """Return the contacts yielded by one of the shard's iterating methods as a list."""
+    return list(getattr(phonebook, method)(*args))
+
+
+def _count(phonebook):
+    """Return the number of contacts in the shard."""
+    return len(phonebook)
+
+
+SHARD_COMMANDS = {
+    'keyed': _keyed,
+    'delete_if_found': _delete_if_found,
+    'add_chunk': _add_chunk,
+    'contacts': _contacts,
+    'page': _page,
+    'count': _count,
+}
+
+
+def _run(phonebook, command, args, kwargs):
+    """Run a shard command or a PhoneBook method and return its result."""
+    if command in SHARD_COMMANDS:
+        return SHARD_COMMANDS[command](phonebook, *args, **kwargs)
+    return getattr(phonebook, command)(*args, **kwargs)
+
+
+def serve_shard(connection, search_index_class, audit_options, cache_options):
+    """Run one shard: a PhoneBook answering commands from the connection until it receives None."""
+    audit.configure_audit_logging(**audit_options)
+    phonebook = PhoneBook(search_index=search_index_class() if search_index_class else None,
+                          result_cache=ResultCache(**cache_options))
+    try:
+        while True:
+            message = connection.recv()
+            if message is None:
+                break
+            command, args, kwargs = message
+            try:
+                connection.send((True, _run(phonebook, command, args, kwargs)))
+            except Exception as e:
+                connection.send((False, e))
+    finally:
+        connection.close()
+        audit.stop_audit_logging()
+
+
+class ShardedPhoneBook:
+    """
+    A phone book partitioned by phone number across several shard processes.
+
+    Each shard is a PhoneBook in its own process, so queries run on several
+    cores at once and no single heap holds every contact. A contact lives in
+    the shard chosen by its phone digits modulo the number of shards. Lookups
+    by phone number go to one shard; searches, date filters, group-bys and
+    sorted listings are sent to every shard in parallel and their already
+    ordered results are combined with a k-way merge.
+
+    Book order is global: every contact is numbered with a book position
+    when it is added, and the shards use these positions as their own book
+    order and to break ties in their name and date indexes. Shards return
+    contacts paired with their order keys, which are built from these
+    positions and order the merge, so results come out as from a single
+    PhoneBook.
+
+    Contacts are copied in and out of the shards: the objects returned are
+    snapshots and changing them does not change the phone book. Duplicates
+    are only detected within a shard, so contacts sharing an email but not a
+    phone number are not merged.
+    """
+    def __init__(self, shards=None, search_index_class=None, audit_options=None, cache_options=None):
+        """Start the shard processes, one per core when shards is None.
+
+        search_index_class, if given, is instantiated in each shard as its
+        search index. audit_options are passed to configure_audit_logging in
+        each shard, and cache_options to the ResultCache of each shard, so
+        {'max_entries': 0} turns result caching off.
+        """
+        shards = shards or multiprocessing.cpu_count()
+        context = multiprocessing.get_context('spawn')
+        self._connections = []
+        self._processes = []
+        for _ in range(shards):
+            connection, shard_connection = context.Pipe()
+            process = context.Process(target=serve_shard, daemon=True,
+                                      args=(shard_connection, search_index_class, audit_options or {},
+                                            cache_options or {}))
+            process.start()
+            shard_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+        self._positions = itertools.count()
+        audit.ensure_audit_logging()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stop the shard processes."""
+        for connection in self._connections:
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    @property
+    def shard_count(self):
+        """Return the number of shards."""
+        return len(self._connections)
+
+    def _shard_for(self, phone_number):
+        """Return the index of the shard holding contacts with this phone number."""
+        digits = phone_digits(phone_number)
+        return int(digits) % len(self._connections) if digits else 0
+
+    @staticmethod
+    def _receive(connections):
+        """Return the results of the commands sent on the connections, re-raising the first shard error.
+
+        Every reply is read before raising, so no connection is left with an
+        unread reply that would answer the next command.
+        """
+        replies = [connection.recv() for connection in connections]
+        for ok, result in replies:
+            if not ok:
+                raise result
+        return [result for _, result in replies]
+
+    def _call(self, shard, command, *args, **kwargs):
+        """Run a command on one shard and return its result."""
+        connection = self._connections[shard]
+        connection.send((command, args, kwargs))
+        return self._receive([connection])[0]
+
+    def _broadcast(self, command, *args, **kwargs):
+        """Run a command on every shard in parallel and return their results in shard order."""
+        for connection in self._connections:
+            connection.send((command, args, kwargs))
+        return self._receive(self._connections)
+
+    def _scatter(self, calls):
+        """Run a dict of {shard: (command, args)} in parallel and return {shard: result}."""
+        for shard, (command, args) in calls.items():
+            self._connections[shard].send((command, args, {}))
+        return dict(zip(calls, self._receive([self._connections[shard] for shard in calls])))
+
+    def _insert(self, command, contacts, *args):
+        """Number contacts with the next book positions and run an inserting command on each shard's part.
+
+        The command is called with each shard's contacts, their positions and
+        then args; returns {shard: result}.
+        """
+        partitions = {}
+        for contact, position in zip(contacts, self._positions):
+            part = partitions.setdefault(self._shard_for(contact.phone_number), ([], []))
+            part[0].append(contact)
+            part[1].append(position)
+        calls = {shard: (command, (part, positions) + args)
+                 for shard, (part, positions) in partitions.items()}
+        return self._scatter(calls)
+
+    def _keyed(self, by, command, *args):
+        """Run a command on every shard, returning its results as lists of (order key, contact) pairs."""
+        return self._broadcast('keyed', by, command, *args)
+
+    @staticmethod
+    def _merged(results):
+        """K-way merge per-shard (order key, contact) lists, each ordered by key, into a list of contacts."""
+        return [contact for _, contact in heapq.merge(*results, key=lambda pair: pair[0])]
+
+    @property
+    def contacts(self):
+        """Return every contact in book order."""
+        return self._merged(self._keyed(None, 'contacts'))
+
+    def __len__(self):
+        return sum(self._broadcast('count'))
+
+    def operation_stats(self):
+        """Return the operation timings of all shards added together.
+
+        The times are spent inside the shards and do not include sending
+        commands and results between processes.
+        """
+        timings = OperationTimings()
+        for stats in self._broadcast('operation_stats'):
+            timings.merge(stats)
+        return timings.stats()
+
+    def reset_operation_stats(self):
+        """Clear the operation timing counters of every shard."""
+        self._broadcast('reset_operation_stats')
+
+    def cache_stats(self):
+        """Return the result cache statistics of each shard, in shard order."""
+        return self._broadcast('cache_stats')
+
+    def add_contact(self, contact):
+        """Add a new contact to the shard for its phone number."""
+        self._call(self._shard_for(contact.phone_number), 'add_contact', contact, next(self._positions))
+
+    def add_contacts(self, contacts):
+        """Add many contacts at once, sending each shard its part in parallel."""
+        return sum(self._insert('add_contacts', contacts).values())
+
+    def restore_contacts(self, contacts):
+        """Insert previously saved contacts without recording history."""
+        self._insert('restore_contacts', contacts)
+
+    def to_columnar(self):
+        """Return a compact columnar copy of the contacts."""
+        return ColumnarContactStore(self.contacts)
+
+    def save_to_file(self, file_path):
+        """Save all contacts to a binary phone book file."""
+        contacts = self.contacts
+        write_contacts(contacts, file_path)
+        logger.info("Saved %d contacts to %s", len(contacts), file_path)
+
+    def load_from_file(self, file_path):
+        """Load the contacts of a binary phone book file, restoring them to the shards in batches."""
+        with ContactFile(file_path) as contact_file:
+            count = len(contact_file)
+            for start in range(0, count, RESTORE_BATCH_SIZE):
+                end = min(start + RESTORE_BATCH_SIZE, count)
+                self.restore_contacts([contact_file[i] for i in range(start, end)])
+        logger.info("Loaded %d contacts from %s", count, file_path)
+        return count
+
+    def view_contacts(self, offset=0, limit=None):
+        """Display the contacts in the phone book, or one page of them with offset and limit."""
+        contacts = list(self.iter_contacts(offset, limit))
+        if not contacts and not offset:
+            print("No contacts found.")
+        for contact in contacts:
+            print(contact)
+
+    def _page(self, method, args, offset, limit, by=None):
+        """Fetch the first offset + limit results of an iterating method from every shard and slice the merge.
+
+        Cursors from contact_cursor are local to one shard, so pages here are
+        selected by offset only.
+        """
+        stop = None if limit is None else offset + limit
+        results = self._keyed(by, 'page', method, *args, 0, stop)
+        return itertools.islice(self._merged(results), offset, stop)
+
+    def iter_contacts(self, offset=0, limit=None):
+        """Return an iterator over one page of contacts in book order."""
+        return self._page('iter_contacts', (), offset, limit)
+
+    def iter_search_contacts(self, query, offset=0, limit=None):
+        """Return an iterator over one page of contacts matching a search, in book order."""
+        return self._page('iter_search_contacts', (query,), offset, limit)
+
+    def search_contacts(self, query):
+        """Search every shard for contacts by name or phone number."""
+        return self._merged(self._keyed(None, 'search_contacts', query))
+
+    def fuzzy_search_contacts(self, query, max_distance=2, limit=10):
+        """Search every shard for names close to the query and keep the best limit matches overall."""
+        ranked = heapq.nsmallest(limit, heapq.merge(*self._broadcast('fuzzy_search_contacts', query, max_distance, limit, True),
+                                                    key=lambda pair: pair[0]),
+                                 key=lambda pair: pair[0])
+        results = [contact for _, contact in ranked]
+        audit.log_search("Fuzzy searched %d shards for: %s, found %d results", self.shard_count, query, len(results))
+        return results
+
+    def find_exact_contact(self, first_name, last_name, phone_number):
+        """Find a contact by exact first name, last name, and phone number."""
+        return self._call(self._shard_for(phone_number), 'find_exact_contact', first_name, last_name, phone_number)
+
+    def find_exact_contacts(self, first_name, last_name, phone_number):
+        """Find every contact with exactly this first name, last name, and phone number."""
+        return self._call(self._shard_for(phone_number), 'find_exact_contacts', first_name, last_name, phone_number)
+
+    def find_contacts_by_phone(self, phone_number):
+        """Find all contacts whose phone number has the same digits."""
+        return self._call(self._shard_for(phone_number), 'find_contacts_by_phone', phone_number)
+
+    def has_contact(self, first_name, last_name, phone_number):
+        """Check whether a contact with these exact details already exists."""
+        return self._call(self._shard_for(phone_number), 'has_contact', first_name, last_name, phone_number)
+
+    def update_contact(self, first_name, last_name, phone_number, new_contact):
+        """Update an existing contact's information, moving it to another shard if its phone number changes."""
+        shard = self._shard_for(phone_number)
+        new_shard = self._shard_for(new_contact.phone_number)
+        if shard == new_shard:
+            return self._call(shard, 'update_contact', first_name, last_name, phone_number, new_contact)
+        moved = self._call(shard, 'move_out', first_name, last_name, phone_number, new_contact)
+        if moved is None:
+            return False
+        position, contact = moved
+        self._call(new_shard, 'move_in', contact, position)
+        return True
+
+    def delete_contact(self, query):
+        """Delete the contacts matching the query in every shard."""
+        if any(self._broadcast('delete_if_found', query)):
+            return True
+        logger.warning("Contact to delete not found for query: %s", query)
+        return False
+
+    def delete_contacts_batch(self, queries):
+        """Delete every contact matching any of the queries and return the number deleted per query."""
+        queries = list(queries)
+        counts = dict.fromkeys(queries, 0)
+        for shard_counts in self._broadcast('delete_contacts_batch', queries):
+            for query, count in shard_counts.items():
+                counts[query] += count
+        return counts
+
+    def import_contacts_from_csv(self, file_path):
+        """Import contacts from a CSV file, printing any rows that could not be added."""
+        report = self.bulk_import_contacts_from_csv(file_path, workers=0)
+        if not report.ok:
+            print(f"{report.error}.")
+        for line_number, row, reason in report.rejected:
+            print(f"Error adding contact from row {row}: {reason}")
+
+    def bulk_import_contacts_from_csv(self, file_path, chunk_size=10000, workers=None, dedupe=False):
+        """Import a large CSV file in chunks, adding each chunk to the shards in parallel."""
+        report = ImportReport(file_path)
+        try:
+            for contacts, rejected in iter_validated_chunks(file_path, report, chunk_size, workers):
+                for added, merged in self._insert('add_chunk', contacts, dedupe).values():
+                    report.imported += added
+                    report.merged += merged
+                report.rejected.extend(rejected)
+        except FileNotFoundError:
+            report.error = "CSV file not found"
+        if report.ok:
+            logger.info("%s", report)
+        else:
+            logger.error("%s", report)
+        return report
+
+    _export = PhoneBook._export
+    export_contacts_to_csv = PhoneBook.export_contacts_to_csv
+    export_contacts_to_jsonl = PhoneBook.export_contacts_to_jsonl
+
+    def deduplicate_contacts(self):
+        """Merge duplicate contacts within each shard and return how many were removed."""
+        return sum(self._broadcast('deduplicate_contacts'))
+
+    def sort_contacts(self, by='first_name'):
+        """Sort the book by first or last name, stably like PhoneBook.sort_contacts.
+
+        Contacts keep their global book positions as tie-breaks, so once every
+        shard has sorted, their order keys merge into the order of the whole
+        book.
+        """
+        self._broadcast('sort_contacts', by)
+
+    def group_contacts_by_initial(self, by='last_name'):
+        """Group contacts by the first letter of their name, merging the groups of every shard."""
+        merged = {}
+        for groups in self._keyed(None, 'group_contacts_by_initial', by):
+            for initial, contacts in groups.items():
+                merged.setdefault(initial, []).append(contacts)
+        return {initial: self._merged(merged[initial]) for initial in sorted(merged)}
+
+    def sorted_contacts(self, by='first_name'):
+        """Return contacts ordered by first or last name, k-way merged from the shards' name indexes."""
+        return self._merged(self._keyed(by, 'sorted_contacts', by))
+
+    def contacts_in_range(self, start, end, by='last_name', page=1, page_size=20):
+        """Return one page of contacts whose name falls from start to end, in name order."""
+        offset = (page - 1) * page_size
+        results = self._keyed(by, 'contacts_in_range', start, end, by, 1, offset + page_size)
+        return self._merged(results)[offset:offset + page_size]
+
+    def count_contacts_in_range(self, start, end, by='last_name'):
+        """Return how many contacts have a name from start to end."""
+        return sum(self._broadcast('count_contacts_in_range', start, end, by))
+
+    view_contact_history = PhoneBook.view_contact_history
+
+    def filter_contacts_by_date(self, start_date, end_date, by='created_at', count_only=False):
+        """Filter contacts created or last updated within a date range, merged in chronological order."""
+        if count_only:
+            return sum(self._broadcast('filter_contacts_by_date', start_date, end_date, by, True))
+        return self._merged(self._keyed(by, 'filter_contacts_by_date', start_date, end_date, by))
+
+    def iter_contacts_by_date(self, start_date, end_date, by='created_at', offset=0, limit=None):
+        """Return an iterator over one page of contacts created or last updated within a date range."""
+        return self._page('iter_contacts_by_date', (start_date, end_date, by), offset, limit, by)
+
+    validate_date = PhoneBook.validate_date
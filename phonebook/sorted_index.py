@@ -0,0 +1,167 @@
+from bisect import bisect_left, bisect_right
+from itertools import compress, count
+from operator import itemgetter
+
+
+class _AfterAll:
+    """
+    A tie-break that sorts after every other, to bound a range of equal keys from above.
+    """
+    def __lt__(self, other):
+        return False
+
+    def __gt__(self, other):
+        return True
+
+
+_AFTER_ALL = _AfterAll()
+
+
+class SortedIndex:
+    """
+    Contacts kept in order of a key function, maintained with bisect.
+
+    Each entry's key is paired with a tie-break so that equal keys stay
+    distinct and keep a stable order: the contact's position from the
+    position function, or an insertion counter without one. The key is
+    computed when a contact is added, so a contact must be removed before
+    the fields its key depends on change and added again afterwards.
+    """
+    def __init__(self, key, position=None):
+        """Initialize an empty index ordered by key(contact), then by position(contact) when given."""
+        self._key = key
+        self._position = position if position is not None else lambda contact, counter=count(): next(counter)
+        self._keys = []
+        self._contacts = []
+        self._entries = {}
+
+    def add(self, contact):
+        """Insert a contact at its sorted position."""
+        entry = (self._key(contact), self._position(contact))
+        position = bisect_right(self._keys, entry)
+        self._keys.insert(position, entry)
+        self._contacts.insert(position, contact)
+        self._entries[contact] = entry
+
+    def add_many(self, contacts):
+        """Insert a batch of contacts, merging them with a single sort when there are many."""
+        if len(contacts) < 32:
+            for contact in contacts:
+                self.add(contact)
+            return
+        keys = self._keys
+        added = self._contacts + list(contacts)
+        for contact in contacts:
+            entry = (self._key(contact), self._position(contact))
+            keys.append(entry)
+            self._entries[contact] = entry
+        # The existing entries form one sorted run, so timsort only sorts the new ones and merges.
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self._keys = [keys[position] for position in order]
+        self._contacts = [added[position] for position in order]
+
+    def chain(self, key):
+        """Break ties between equal keys by a second key function before the current tie-break.
+
+        The keys themselves do not change, so only the runs of contacts with
+        equal keys are re-sorted, stably by the second key.
+        """
+        position = self._position
+        self._position = lambda contact: (key(contact), position(contact))
+        contacts = self._contacts
+        keys = list(map(itemgetter(0), self._keys))
+        seconds = list(map(key, contacts))
+        ties = list(map(itemgetter(1), self._keys))
+        start = 0
+        while start < len(keys):
+            stop = bisect_right(keys, keys[start], start)
+            if stop - start > 1:
+                run = sorted(range(start, stop), key=seconds.__getitem__)
+                contacts[start:stop] = [contacts[index] for index in run]
+                seconds[start:stop] = [seconds[index] for index in run]
+                ties[start:stop] = [ties[index] for index in run]
+            start = stop
+        self._keys = list(zip(keys, zip(seconds, ties)))
+        self._entries = dict(zip(contacts, self._keys))
+
+    def sort_key(self, contact):
+        """Return the (key, tie-break) entry that orders a contact in the index."""
+        return self._entries[contact]
+
+    def remove(self, contact):
+        """Remove a contact from the index."""
+        entry = self._entries.pop(contact, None)
+        if entry is None:
+            return
+        position = bisect_left(self._keys, entry)
+        del self._keys[position]
+        del self._contacts[position]
+
+    def remove_many(self, contacts):
+        """Remove a set of contacts, rebuilding the lists in one pass when there are many."""
+        removed = [contact for contact in contacts if contact in self._entries]
+        if len(removed) < 32:
+            for contact in removed:
+                self.remove(contact)
+            return
+        for contact in removed:
+            del self._entries[contact]
+        kept = [contact not in contacts for contact in self._contacts]
+        self._keys = list(compress(self._keys, kept))
+        self._contacts = list(compress(self._contacts, kept))
+
+    def __len__(self):
+        """Return the number of indexed contacts."""
+        return len(self._contacts)
+
+    def __iter__(self):
+        """Iterate over the contacts in key order."""
+        return iter(self._contacts)
+
+    def _bounds(self, low, high):
+        """Return the positions spanning keys from low to high, both inclusive; None is unbounded."""
+        start = 0 if low is None else bisect_left(self._keys, (low,))
+        stop = len(self._keys) if high is None else bisect_right(self._keys, (high, _AFTER_ALL))
+        return start, max(start, stop)
+
+    def count_range(self, low=None, high=None):
+        """Return the number of contacts with keys from low to high."""
+        start, stop = self._bounds(low, high)
+        return stop - start
+
+    def ipage(self, offset=0, limit=None, after=None):
+        """Yield contacts in index order, starting after the entry after from sort_key when given.
+
+        offset and limit select a slice of what follows, as in range. The
+        index must not be modified while the iterator is in use.
+        """
+        start = 0 if after is None else bisect_right(self._keys, after)
+        stop = len(self._contacts) if limit is None else min(len(self._contacts), start + offset + limit)
+        contacts = self._contacts
+        for position in range(start + offset, stop):
+            yield contacts[position]
+
+    def irange(self, low=None, high=None, offset=0, limit=None, after=None):
+        """Yield contacts with keys from low to high in key order without building a list.
+
+        offset and limit select a slice as in range, of the contacts following
+        the entry after from sort_key when given. The index must not be
+        modified while the iterator is in use.
+        """
+        start, stop = self._bounds(low, high)
+        if after is not None:
+            start = min(max(start, bisect_right(self._keys, after)), stop)
+        start = min(start + offset, stop)
+        if limit is not None:
+            stop = min(stop, start + limit)
+        contacts = self._contacts
+        for position in range(start, stop):
+            yield contacts[position]
+
+    def range(self, low=None, high=None, offset=0, limit=None):
+        """Return contacts with keys from low to high in key order, skipping offset and taking at most limit."""
+        start, stop = self._bounds(low, high)
+        start = min(start + offset, stop)
+        if limit is not None:
+            stop = min(stop, start + limit)
+        return self._contacts[start:stop]
@@ -0,0 +1,180 @@
+import io
+import mmap
+import os
+import struct
+from contact import Contact
+from utils import datetime_to_micros, int_to_phone, micros_to_datetime, phone_to_int
+
+# File layout: a fixed header, a table of fixed-width records, then a heap of
+# UTF-8 strings that the records point into by (offset, length). The header
+# also carries the journal sequence number the file was written at.
+MAGIC = b'PHBOOK\x00\x01'
+VERSION = 2
+HEADER = struct.Struct('<8sIIQQQ')
+RECORD = struct.Struct('<qqq' + 'QI' * 5)
+NULL_LENGTH = 0xFFFFFFFF
+HISTORY_SEPARATOR = '\x1e'
+HISTORY_FIELD_SEPARATOR = '\x1f'
+
+
+class StorageError(Exception):
+    """Raised when a phone book file is missing, truncated or not in the expected format."""
+
+
+class _HeapWriter:
+    """
+    Accumulates the string heap and returns (offset, length) references.
+    """
+    def __init__(self):
+        """Initialize an empty heap."""
+        self.buffer = io.BytesIO()
+        self.shared = {}
+
+    def add(self, text, share=False):
+        """Append a string to the heap and return its reference; share reuses identical strings."""
+        if text is None:
+            return 0, NULL_LENGTH
+        if share and text in self.shared:
+            return self.shared[text]
+        data = text.encode('utf-8')
+        reference = (self.buffer.tell(), len(data))
+        self.buffer.write(data)
+        if share:
+            self.shared[text] = reference
+        return reference
+
+
+def _encode_history(history):
+    """Encode (timestamp, action, detail) history entries as one string, or None if empty."""
+    if not history:
+        return None
+    entries = []
+    for entry in history:
+        if isinstance(entry, str):
+            entries.append(entry)
+        else:
+            timestamp, action, detail = entry
+            entries.append(f"{timestamp!r}{HISTORY_FIELD_SEPARATOR}{action}{HISTORY_FIELD_SEPARATOR}{detail or ''}")
+    return HISTORY_SEPARATOR.join(entries)
+
+
+def _decode_history(text):
+    """Decode a string written by _encode_history back into history entries."""
+    if not text:
+        return []
+    history = []
+    for entry in text.split(HISTORY_SEPARATOR):
+        fields = entry.split(HISTORY_FIELD_SEPARATOR, 2)
+        if len(fields) == 3:
+            history.append((float(fields[0]), fields[1], fields[2] or None))
+        else:
+            history.append(entry)
+    return history
+
+
+def write_contacts(contacts, file_path, sequence=0):
+    """Write contacts to a phone book file, replacing it atomically."""
+    contacts = list(contacts)
+    heap = _HeapWriter()
+    heap_offset = HEADER.size + RECORD.size * len(contacts)
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(contacts), heap_offset, sequence))
+        for contact in contacts:
+            history = _encode_history(contact.history)
+            file.write(RECORD.pack(
+                phone_to_int(contact.phone_number),
+                datetime_to_micros(contact.created_at),
+                datetime_to_micros(contact.updated_at),
+                *heap.add(contact.first_name, share=True),
+                *heap.add(contact.last_name, share=True),
+                *heap.add(contact.email),
+                *heap.add(contact.address),
+                *heap.add(history)))
+        file.write(heap.buffer.getbuffer())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, file_path)
+
+
+class ContactFile:
+    """
+    A read-only, memory-mapped view of a phone book file.
+
+    Opening only reads the header; each record is decoded into a Contact when
+    it is accessed, so large files open in constant time. A string reference
+    past the end of the file raises StorageError when it is read.
+    """
+    def __init__(self, file_path):
+        """Open and map the given phone book file."""
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < HEADER.size:
+                raise StorageError(f"{file_path} is too small to be a phone book file")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            (magic, version, record_size, self._count,
+             self._heap_offset, self.sequence) = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+                self._map.close()
+                raise StorageError(f"{file_path} is not a phone book file")
+            if self._heap_offset != HEADER.size + RECORD.size * self._count or self._heap_offset > size:
+                self._map.close()
+                raise StorageError(f"{file_path} is truncated")
+            self._heap_size = size - self._heap_offset
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _string(self, offset, length):
+        """Decode a string from the heap, or return None for a null reference."""
+        if length == NULL_LENGTH:
+            return None
+        if offset + length > self._heap_size:
+            raise StorageError(f"{self.file_path} is truncated: a string ends past the end of the file")
+        start = self._heap_offset + offset
+        try:
+            return self._map[start:start + length].decode('utf-8')
+        except UnicodeDecodeError:
+            raise StorageError(f"{self.file_path} is corrupt: a string is not valid UTF-8")
+
+    def __len__(self):
+        """Return the number of contacts in the file."""
+        return self._count
+
+    def __getitem__(self, index):
+        """Materialize the contact stored at the given position."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("contact index out of range")
+        (phone_number, created_at, updated_at,
+         first_offset, first_length, last_offset, last_length,
+         email_offset, email_length, address_offset, address_length,
+         history_offset, history_length) = RECORD.unpack_from(self._map, HEADER.size + RECORD.size * index)
+        return Contact.from_record(
+            self._string(first_offset, first_length),
+            self._string(last_offset, last_length),
+            int_to_phone(phone_number),
+            self._string(email_offset, email_length),
+            self._string(address_offset, address_length),
+            micros_to_datetime(created_at),
+            micros_to_datetime(updated_at),
+            _decode_history(self._string(history_offset, history_length)))
+
+    def __iter__(self):
+        """Materialize every contact in file order."""
+        for index in range(self._count):
+            yield self[index]
+
+    def close(self):
+        """Unmap and close the file."""
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,64 @@
+import functools
+import time
+
+
+class OperationTimings:
+    """
+    Call counts and wall-clock time per named operation.
+    """
+    def __init__(self):
+        """Initialize with no recorded calls."""
+        self._timings = {}
+
+    def record(self, name, seconds):
+        """Add one call of an operation that took the given number of seconds."""
+        timing = self._timings.get(name)
+        if timing is None:
+            self._timings[name] = [1, seconds, seconds]
+        else:
+            timing[0] += 1
+            timing[1] += seconds
+            if seconds > timing[2]:
+                timing[2] = seconds
+
+    def merge(self, stats):
+        """Add the counters of a stats() dict, such as one from another phone book."""
+        for name, stat in stats.items():
+            timing = self._timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += stat['calls']
+            timing[1] += stat['total_ms'] / 1000
+            timing[2] = max(timing[2], stat['max_ms'] / 1000)
+
+    def reset(self):
+        """Forget every recorded call."""
+        self._timings.clear()
+
+    def stats(self):
+        """Return {operation: {calls, total_ms, mean_ms, max_ms}} in alphabetical order of operation."""
+        return {
+            name: {
+                'calls': calls,
+                'total_ms': total * 1000,
+                'mean_ms': total * 1000 / calls if calls else 0.0,
+                'max_ms': longest * 1000,
+            }
+            for name, (calls, total, longest) in sorted(self._timings.items())
+        }
+
+
+def timed(method):
+    """Decorate a method so each call is recorded in self._timings under the method's name.
+
+    The time of a call includes any timed operations it makes itself, such as
+    the search run by delete_contact.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._timings.record(name, time.perf_counter() - start)
+    return wrapper
@@ -1,16 +1,30 @@
-import re
+from datetime import datetime, timedelta
+import validation
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
 
 def validate_phone_number(phone_number):
     """Validate the phone number format."""
-    pattern = re.compile(r'^\(\d{3}\) \d{3}-\d{4}$')
-    if not pattern.match(phone_number):
-        raise ValueError("Phone number must be in the format (###) ###-####")
-    return phone_number
+    return validation.check_formatted_phone_number(phone_number)
 
 def validate_email(email):
     """Validate the email address format."""
-    if email:
-        pattern = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
-        if not pattern.match(email):
-            raise ValueError("Invalid email address")
-    return email
\ No newline at end of file
+    return validation.validate_email(email)
+
+def datetime_to_micros(value):
+    """Convert a naive datetime to integer microseconds since the epoch."""
+    return (value - EPOCH) // MICROSECOND
+
+def micros_to_datetime(value):
+    """Convert integer microseconds since the epoch back to a naive datetime."""
+    return EPOCH + timedelta(microseconds=value)
+
+def phone_to_int(phone_number):
+    """Convert a formatted phone number to an integer of its digits."""
+    return int(validation.phone_digits(phone_number))
+
+def int_to_phone(value):
+    """Convert an integer of phone digits back to (###) ###-#### format."""
+    digits = f"{value:010d}"
+    return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
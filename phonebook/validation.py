@@ -0,0 +1,71 @@
+import re
+
+FORMATTED_PHONE_PATTERN = re.compile(r'^\(\d{3}\) \d{3}-\d{4}$')
+EMAIL_PATTERN = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+NON_DIGITS_PATTERN = re.compile(r'\D')
+
+# Characters that commonly separate phone digits; deleting them with
+# str.translate is much cheaper than a regular expression substitution.
+_PHONE_SEPARATORS = str.maketrans('', '', '()-. +/')
+
+PHONE_LENGTH_ERROR = "Phone number must contain exactly 10 digits"
+PHONE_FORMAT_ERROR = "Phone number must be in the format (###) ###-####"
+EMAIL_ERROR = "Invalid email address"
+
+
+def phone_digits(phone_number):
+    """Return only the digits of a phone number."""
+    if not isinstance(phone_number, str):
+        raise TypeError("Phone number must be a string")
+    digits = phone_number.translate(_PHONE_SEPARATORS)
+    if digits.isdecimal():
+        return digits
+    return NON_DIGITS_PATTERN.sub('', phone_number)
+
+
+def format_phone_number(phone_number):
+    """Validate and format the phone number into (###) ###-#### format."""
+    digits = phone_digits(phone_number)
+    if len(digits) != 10:
+        raise ValueError(PHONE_LENGTH_ERROR)
+    return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+
+
+def check_formatted_phone_number(phone_number):
+    """Validate that the phone number is already in (###) ###-#### format."""
+    if not FORMATTED_PHONE_PATTERN.match(phone_number):
+        raise ValueError(PHONE_FORMAT_ERROR)
+    return phone_number
+
+
+def validate_email(email):
+    """Validate the email address against standard criteria; empty emails are allowed."""
+    if email and not EMAIL_PATTERN.match(email):
+        raise ValueError(EMAIL_ERROR)
+    return email
+
+
+def format_phone_numbers(phone_numbers):
+    """Format a column of phone numbers, returning None in place of each invalid one."""
+    translate = str.translate
+    substitute = NON_DIGITS_PATTERN.sub
+    formatted = []
+    append = formatted.append
+    for phone_number in phone_numbers:
+        if not isinstance(phone_number, str):
+            append(None)
+            continue
+        digits = translate(phone_number, _PHONE_SEPARATORS)
+        if not digits.isdecimal():
+            digits = substitute('', phone_number)
+        if len(digits) == 10:
+            append(f"({digits[:3]}) {digits[3:6]}-{digits[6:]}")
+        else:
+            append(None)
+    return formatted
+
+
+def validate_emails(emails):
+    """Check a column of emails, returning True for each valid or empty one."""
+    match = EMAIL_PATTERN.match
+    return [not email or (isinstance(email, str) and match(email) is not None) for email in emails]
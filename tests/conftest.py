@@ -0,0 +1,9 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'phonebook'))
+
+import audit
+
+# Keep the tests from appending to phonebook.log
+audit.configure_audit_logging(filename=os.devnull)
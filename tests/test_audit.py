@@ -0,0 +1,94 @@
+import os
+import random
+import threading
+from datetime import datetime
+import pytest
+import audit
+from contact import ADDED, UPDATED, Contact, format_history_entry
+from phonebook import PhoneBook
+
+
+@pytest.fixture
+def audit_log(tmp_path):
+    """Log audit records to a temporary file, returning a function that stops the listener and reads it."""
+    path = tmp_path / 'audit.log'
+
+    def read():
+        audit.stop_audit_logging()
+        return path.read_text().splitlines()
+
+    yield path, read
+    audit.configure_audit_logging(filename=os.devnull)
+
+
+class Query:
+    """A search argument that records the thread that formats it."""
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return 'query'
+
+
+def test_records_are_formatted_by_the_listener(audit_log):
+    path, read = audit_log
+    audit.configure_audit_logging(filename=str(path))
+    query = Query()
+    audit.log_search("Searched for: %s, found %d results", query, 3)
+    lines = read()
+    assert [line.split(' - ', 1)[1] for line in lines] == ["Searched for: query, found 3 results"]
+    assert query.threads and threading.main_thread() not in query.threads
+
+
+@pytest.mark.parametrize('rate', [0.0, 0.25, 1.0])
+def test_searches_are_sampled(audit_log, rate):
+    path, read = audit_log
+    audit.configure_audit_logging(filename=str(path), search_sample_rate=rate)
+    random.seed(5)
+    expected = sum(rate >= 1.0 or random.random() < rate for _ in range(400))
+    random.seed(5)
+    for number in range(400):
+        audit.log_search("Searched for: %s", number)
+    audit.logger.info("Not a search")
+    lines = read()
+    assert len(lines) == expected + 1
+    assert 0 < expected < 400 or rate in (0.0, 1.0)
+
+
+def test_phone_book_searches_are_sampled(audit_log):
+    path, read = audit_log
+    audit.configure_audit_logging(filename=str(path), search_sample_rate=0.0)
+    phonebook = PhoneBook()
+    phonebook.add_contact(Contact('Ann', 'Lee', '555-123-4567'))
+    for _ in range(10):
+        assert phonebook.search_contacts('ann')
+    phonebook.fuzzy_search_contacts('anne')
+    assert not [line for line in read() if 'earched for' in line]
+
+
+def test_history_is_stored_raw_and_formatted_on_view(capsys):
+    phonebook = PhoneBook()
+    phonebook.add_contact(Contact('Ann', 'Lee', '555-123-4567'))
+    contact = phonebook.contacts[0]
+    assert phonebook.update_contact('Ann', 'Lee', '(555) 123-4567', Contact('Ann', 'Li', '555-123-4567'))
+    (added_at, added, detail), (updated_at, updated, previous) = contact.history
+    assert (added, detail) == (ADDED, None) and updated == UPDATED
+    assert isinstance(added_at, float) and added_at <= updated_at
+    assert previous == "Ann Lee, (555) 123-4567, None, None"
+    phonebook.view_contact_history(contact)
+    assert capsys.readouterr().out.splitlines() == [
+        "History for Ann Li:",
+        f"{datetime.fromtimestamp(added_at):%Y-%m-%d %H:%M:%S} - Added contact",
+        f"{datetime.fromtimestamp(updated_at):%Y-%m-%d %H:%M:%S} - Updated contact from {previous}",
+    ]
+
+
+def test_legacy_history_strings_are_shown_as_they_are():
+    legacy = "2023-04-05 06:07:08 - Added contact"
+    assert format_history_entry(legacy) == legacy
+    timestamp = datetime(2024, 1, 2, 3, 4, 5).timestamp()
+    assert format_history_entry((timestamp, 'X', None)) == "2024-01-02 03:04:05 - X"
+    contact = Contact('Ann', 'Lee', '555-123-4567')
+    contact.history = [legacy, (timestamp, ADDED, None)]
+    assert contact.formatted_history() == [legacy, "2024-01-02 03:04:05 - Added contact"]
@@ -0,0 +1,29 @@
+from columnar import ColumnarContactStore
+from contact import Contact
+from phonebook import PhoneBook
+
+
+def make_contacts(count):
+    return [Contact(f"First{i % 7}", f"Last{i}", f"555-000-{i:04d}", f"user{i}@example.com" if i % 2 else None)
+            for i in range(count)]
+
+
+def test_store_round_trips_contacts():
+    contacts = make_contacts(20)
+    contacts[3].update_history('A')
+    store = ColumnarContactStore(contacts)
+    assert len(store) == 20
+    for copy, contact in zip(store, contacts):
+        assert type(copy) is Contact and copy is not contact
+        assert (str(copy), copy.created_at, copy.updated_at, copy.history) == \
+            (str(contact), contact.created_at, contact.updated_at, contact.history)
+    assert store.first_names[0] is store.first_names[7]
+
+
+def test_to_columnar_copies_in_book_order():
+    phonebook = PhoneBook()
+    phonebook.add_contacts(make_contacts(10))
+    phonebook.sort_contacts('last_name')
+    store = phonebook.to_columnar()
+    assert [str(contact) for contact in store] == [str(contact) for contact in phonebook.contacts]
+    assert store[0].history == phonebook.contacts[0].history
@@ -0,0 +1,83 @@
+from contact import ADDED, MERGED, UPDATED, Contact
+from phonebook import PhoneBook
+
+HEADER = 'First Name,Last Name,Phone Number,Email,Address\n'
+FIRST = ('Ann,Lee,555-123-4567,ann@example.com,\n'
+         'Bob,Jones,555-765-4321,,\n'
+         'Cy,Do,555-000-0001,cy@example.com,\n')
+# A typo of Ann on her number, Ann on a new number with her email, Cy's email on someone else, and Bob again
+SECOND = ('Anne,Lee,(555) 123-4567,,1 Main St\n'
+          'Ann,Lee,555-999-0000,ANN@example.com,\n'
+          'Di,Do,555-000-0002,cy@example.com,\n'
+          'Bob,Jones,555.765.4321,bob@example.com,2 Side St\n')
+
+
+def import_files(tmp_path, dedupe):
+    phonebook = PhoneBook()
+    reports = []
+    for name, rows in (('first.csv', FIRST), ('second.csv', SECOND)):
+        path = tmp_path / name
+        path.write_text(HEADER + rows)
+        reports.append(phonebook.bulk_import_contacts_from_csv(str(path), workers=0, dedupe=dedupe))
+    return phonebook, reports
+
+
+def test_inline_dedupe_merges_across_imports(tmp_path):
+    phonebook, reports = import_files(tmp_path, dedupe=True)
+    assert [report.merged for report in reports] == [0, 3]
+    assert [str(contact) for contact in phonebook.contacts] == [
+        'Ann Lee, (555) 123-4567, ann@example.com, 1 Main St',
+        'Bob Jones, (555) 765-4321, bob@example.com, 2 Side St',
+        'Cy Do, (555) 000-0001, cy@example.com, ',
+        'Di Do, (555) 000-0002, cy@example.com, ',
+    ]
+    assert phonebook.search_contacts('555-999') == []
+    assert phonebook.search_contacts('anne') == []
+
+
+def test_inline_dedupe_matches_deduplicating_afterwards(tmp_path):
+    inline, _ = import_files(tmp_path, dedupe=True)
+    afterwards, reports = import_files(tmp_path, dedupe=False)
+    assert [report.merged for report in reports] == [0, 0] and len(afterwards) == 7
+    assert afterwards.deduplicate_contacts() == 3
+    assert [str(contact) for contact in inline.contacts] == [str(contact) for contact in afterwards.contacts]
+
+
+def test_email_matches_need_the_same_name():
+    phonebook = PhoneBook()
+    phonebook.add_contacts([Contact('Ann', 'Lee', '555-123-4567', 'ann@example.com'),
+                            Contact('Ann', 'Lee', '555-222-3333', 'Ann@Example.com'),
+                            Contact('Bea', 'Lee', '555-444-5555', 'ann@example.com'),
+                            Contact('Ann', 'Lee', '555-666-7777')])
+    assert phonebook.deduplicate_contacts() == 1
+    assert [contact.phone_number for contact in phonebook.contacts] == \
+        ['(555) 123-4567', '(555) 444-5555', '(555) 666-7777']
+
+
+def test_duplicate_candidates_share_a_phone_or_email():
+    phonebook = PhoneBook()
+    existing = [Contact('Ann', 'Lee', '555-123-4567'), Contact('Bob', 'Jones', '555-765-4321', 'bob@example.com'),
+                Contact('Cy', 'Do', '555-000-0001'), Contact('Di', 'Do', '555-000-0002', 'BOB@example.com')]
+    phonebook.add_contacts(existing)
+    batch = [Contact('Rob', 'Jones', '555-999-0000', 'Bob@Example.com'), Contact('Ann', 'Lea', '(555) 123-4567')]
+    phonebook.add_contacts(batch)
+    assert phonebook._duplicate_candidates(batch) == [existing[0], existing[1], existing[3], *batch]
+    assert phonebook.deduplicate_contacts(batch) == 1
+    assert batch[1] not in phonebook.contacts and len(phonebook) == 5
+
+
+def test_merged_histories_are_combined_in_time_order():
+    phonebook = PhoneBook()
+    first = Contact('Ann', 'Lee', '555-123-4567')
+    phonebook.add_contact(first)
+    assert phonebook.update_contact('Ann', 'Lee', '(555) 123-4567', Contact('Ann', 'Lee', '555-123-4567', 'ann@example.com'))
+    second = Contact('Anne', 'Lee', '555-123-4567', address='1 Main St')
+    phonebook.add_contact(second)
+    second_added = second.history[0]
+    assert phonebook.deduplicate_contacts([second]) == 1
+    assert phonebook.contacts == [first]
+    assert (first.email, first.address) == ('ann@example.com', '1 Main St')
+    assert [action for _, action, _ in first.history] == [ADDED, UPDATED, ADDED, MERGED]
+    assert first.history[2] == second_added
+    assert [entry[0] for entry in first.history] == sorted(entry[0] for entry in first.history)
+    assert first.history[-1][2] == str(second)
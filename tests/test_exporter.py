@@ -0,0 +1,30 @@
+import csv
+import json
+import pytest
+from contact import Contact
+from exporter import CSV_HEADERS, write_export
+
+CONTACTS = [Contact('Alice', 'Smith', '555-123-4567', 'alice@example.com', '1 Main St'),
+            Contact('Bob', 'Jones', '555-765-4321'),
+            Contact('Carol', 'Lee', '555-000-0001', '', '')]
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_jsonl_keeps_missing_fields_null(tmp_path, workers):
+    path = str(tmp_path / 'book.jsonl')
+    assert write_export(CONTACTS, path, 'jsonl', chunk_size=2, workers=workers) == 3
+    with open(path, encoding='utf-8') as file:
+        records = [json.loads(line) for line in file]
+    assert [(record['email'], record['address']) for record in records] == \
+        [('alice@example.com', '1 Main St'), (None, None), ('', '')]
+    assert records[1]['created_at'] == CONTACTS[1].created_at.isoformat()
+
+
+def test_csv_writes_missing_fields_empty(tmp_path):
+    path = str(tmp_path / 'book.csv')
+    assert write_export(CONTACTS, path, 'csv') == 3
+    with open(path, newline='', encoding='utf-8') as file:
+        rows = list(csv.reader(file))
+    assert rows[0] == CSV_HEADERS
+    assert rows[2][:5] == ['Bob', 'Jones', '(555) 765-4321', '', '']
+    assert rows[3][3:5] == ['', '']
@@ -0,0 +1,57 @@
+import random
+import pytest
+from contact import Contact
+from fuzzy import BigramTermIndex, FuzzyIndex, edit_distance, transposition_distance
+
+
+def random_terms(rng, count, letters='abcdeno', longest=7):
+    return {''.join(rng.choice(letters) for _ in range(rng.randint(0, longest))) for _ in range(count)}
+
+
+@pytest.mark.parametrize('max_distance', [0, 1, 2, 3])
+def test_bigram_index_matches_brute_force(max_distance):
+    rng = random.Random(max_distance)
+    terms = random_terms(rng, 2000)
+    index = BigramTermIndex()
+    for term in terms:
+        index.add(term)
+    for query in random_terms(rng, 200, letters='abcdenoz', longest=8):
+        expected = {(edit_distance(query, term), term) for term in terms
+                    if edit_distance(query, term) <= max_distance}
+        assert set(index.search(query, max_distance)) == expected
+
+
+def test_bigram_index_forgets_removed_terms():
+    index = BigramTermIndex()
+    for term in ('smith', 'smyth', 'jones'):
+        index.add(term)
+    index.remove('smyth')
+    index.remove('absent')
+    assert len(index) == 2
+    assert index.search('smyth', 1) == [(1, 'smith')]
+    index.remove('smith')
+    index.remove('jones')
+    assert not index._postings and not index._terms_by_length
+
+
+def test_bounded_distances_match_unbounded():
+    rng = random.Random(5)
+    pairs = [(''.join(rng.choice('abc') for _ in range(rng.randint(0, 7))),
+              ''.join(rng.choice('abc') for _ in range(rng.randint(0, 7)))) for _ in range(2000)]
+    for first, second in pairs:
+        for distance in (edit_distance, transposition_distance):
+            exact = distance(first, second)
+            for max_distance in range(4):
+                assert distance(first, second, max_distance) == min(exact, max_distance + 1)
+
+
+def test_fuzzy_index_prunes_terms_of_removed_contacts():
+    john = Contact('John', 'Smith', '555-123-4567')
+    jane = Contact('Jane', 'Smyth', '555-765-4321')
+    index = FuzzyIndex()
+    index.add(john)
+    index.add(jane)
+    assert [contact for _, contact in index.search('jonh smiht')] == [john, jane]
+    index.remove(jane)
+    assert 'smyth' not in index._spelling and 'jane' not in index._spelling
+    assert [contact for _, contact in index.search('smyth')] == [john]
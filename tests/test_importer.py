@@ -0,0 +1,67 @@
+import pytest
+from importer import MISSING_NAME_ERROR
+from phonebook import PhoneBook
+from validation import EMAIL_ERROR, PHONE_LENGTH_ERROR
+
+HEADER = 'First Name,Last Name,Phone Number,Email,Address\n'
+BAD_ROWS = ('Ann,Lee,555-123-4567,ann@example.com,1 Main St\n'
+            'Bob,Jones,12345,,\n'
+            'Cy,Do,(555) 000 0001,not-an-email,\n'
+            'Dee,Kim,555.000.0002,,"2 Side St\nApt 4"\n'
+            'Eve,Li,555-000-0003,,\n'
+            'Fay,Ng,555-000-00004,fay@example.com,\n')
+
+
+def write(tmp_path, text, name='book.csv'):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_bulk_import_reports_rejected_rows(tmp_path):
+    path = write(tmp_path, HEADER + BAD_ROWS + 'Gus\n')
+    report = PhoneBook().bulk_import_contacts_from_csv(path, chunk_size=2, workers=0)
+    assert report.ok and report.imported == 3
+    # Line numbers count physical lines, so the quoted address spanning two moves the rows after it down
+    assert [(line_number, row['First Name'], reason) for line_number, row, reason in report.rejected] == \
+        [(3, 'Bob', PHONE_LENGTH_ERROR), (4, 'Cy', EMAIL_ERROR), (8, 'Fay', PHONE_LENGTH_ERROR),
+         (9, 'Gus', MISSING_NAME_ERROR)]
+    assert str(report) == f"Imported 3 contacts from {path}, rejected 4 rows"
+
+
+def test_bulk_import_reports_missing_headers_and_files(tmp_path):
+    phonebook = PhoneBook()
+    report = phonebook.bulk_import_contacts_from_csv(write(tmp_path, 'First Name,Surname,Phone Number\nAnn,Lee,555-123-4567\n'),
+                                                     workers=0)
+    assert not report.ok and 'missing mandatory headers' in report.error
+    assert report.imported == 0 and not report.rejected
+    report = phonebook.bulk_import_contacts_from_csv(str(tmp_path / 'missing.csv'), workers=0)
+    assert not report.ok and report.error == "CSV file not found"
+    assert str(report) == f"Import of {tmp_path / 'missing.csv'} failed: CSV file not found"
+    assert len(phonebook) == 0
+
+
+def test_bulk_import_matches_row_by_row_import(tmp_path, capsys):
+    path = write(tmp_path, HEADER + BAD_ROWS)
+    expected = PhoneBook()
+    expected.import_contacts_from_csv(path)
+    assert capsys.readouterr().out.count('Error adding contact') == 3
+    in_process, pooled = PhoneBook(), PhoneBook()
+    reports = [book.bulk_import_contacts_from_csv(path, chunk_size=2, workers=workers)
+               for book, workers in ((in_process, 0), (pooled, 2))]
+    for book, report in zip((in_process, pooled), reports):
+        assert report.imported == 3 and len(report.rejected) == 3
+        assert [str(contact) for contact in book.contacts] == [str(contact) for contact in expected.contacts]
+    assert reports[0].rejected == reports[1].rejected
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 100])
+def test_pooled_import_keeps_file_order(tmp_path, chunk_size):
+    rows = ''.join(f"First{i},Last{i},555-000-{i:04d},,\n" if i % 5 else f"First{i},Last{i},{i},,\n"
+                   for i in range(40))
+    path = write(tmp_path, HEADER + rows)
+    phonebook = PhoneBook()
+    report = phonebook.bulk_import_contacts_from_csv(path, chunk_size=chunk_size, workers=2)
+    assert report.imported == 32
+    assert [contact.first_name for contact in phonebook.contacts] == [f"First{i}" for i in range(40) if i % 5]
+    assert [line_number for line_number, _, _ in report.rejected] == list(range(2, 42, 5))
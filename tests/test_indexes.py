@@ -0,0 +1,165 @@
+import random
+import string
+from datetime import datetime
+import pytest
+from contact import Contact
+from fuzzy import soundex
+from phonebook import PhoneBook
+from search_index import SubstringScanIndex, TrigramIndex
+from validation import phone_digits
+
+FIRST_NAMES = ['Ann', 'Anne', 'Bob', 'Jo', 'John', 'Jon', 'Mary Jo', 'Al', 'Zoë']
+LAST_NAMES = ['Smith', 'Smyth', 'Jones', 'Lee', 'Li', "O'Brien", 'van Dyke', 'Do']
+QUERIES = ['', 'a', 'J', 'jo', 'JO', 'n', ' ', '5', '55', '(5', ') ', '-', 'sm', 'smi', 'SMITH', 'ith', 'ohn',
+           'mary jo', 'y j', 'o\'b', '555)', '123-', '0', 'zz', 'zoë', 'an', 'ee']
+
+
+def old_search(contacts, query):
+    """The substring scan search_contacts ran before it had an index."""
+    return [contact for contact in contacts if query.lower() in contact.first_name.lower()
+            or query.lower() in contact.last_name.lower() or query in contact.phone_number]
+
+
+def random_contact(rng, phones):
+    return Contact(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), rng.choice(phones),
+                   rng.choice([None, '', 'a@example.com', 'B@example.com', 'c@example.com']),
+                   rng.choice([None, '1 Main St']))
+
+
+def typo(name, rng):
+    position = rng.randrange(len(name))
+    return name[:position] + rng.choice(string.ascii_lowercase) + name[position + 1:]
+
+
+def grouped(pairs):
+    groups = {}
+    for key, contact in pairs:
+        groups.setdefault(key, set()).add(contact)
+    return groups
+
+
+def name_order(phonebook, field):
+    """The order of a name index: name, then the other name once sorted by it, then position."""
+    other = 'last_name' if field == 'first_name' else 'first_name'
+    if field in phonebook._chained_names:
+        return lambda c: (getattr(c, field).lower(), getattr(c, other).lower(), phonebook._order[c])
+    return lambda c: (getattr(c, field).lower(), phonebook._order[c])
+
+
+def check_indexes(phonebook):
+    """Compare every index of a phone book with one recomputed from its contacts."""
+    phonebook._build_indexes()
+    contacts = phonebook.contacts
+    assert len(set(contacts)) == len(contacts)
+    assert set(phonebook._order) == set(contacts)
+    if phonebook._sorted_by is None:
+        assert contacts == sorted(contacts, key=phonebook._order.__getitem__)
+    else:
+        assert contacts == sorted(contacts, key=name_order(phonebook, phonebook._sorted_by))
+
+    def as_sets(index):
+        return {key: set(bucket) for key, bucket in index.items()}
+
+    assert as_sets(phonebook._phone_index) == grouped((phone_digits(c.phone_number), c) for c in contacts)
+    assert as_sets(phonebook._exact_index) == grouped(
+        ((c.first_name.lower(), c.last_name.lower(), c.phone_number), c) for c in contacts)
+    assert as_sets(phonebook._email_index) == grouped((c.email.lower(), c) for c in contacts if c.email)
+    for field in ('first_name', 'last_name'):
+        assert as_sets(phonebook._initial_groups[field]) == grouped((getattr(c, field)[:1].upper(), c) for c in contacts)
+
+    for field, index in phonebook._name_indexes.items():
+        assert list(index) == sorted(contacts, key=name_order(phonebook, field))
+    for field, index in phonebook._date_indexes.items():
+        assert list(index) == sorted(contacts, key=lambda c: (getattr(c, field), phonebook._order[c]))
+
+    search_index = phonebook._search_index
+    assert set(search_index._texts) == set(contacts)
+    if isinstance(search_index, TrigramIndex):
+        expected = {}
+        for contact in contacts:
+            for gram in search_index._contact_trigrams(search_index._index_texts(contact)):
+                expected.setdefault(gram, set()).add(contact)
+        assert search_index._postings == expected
+
+    fuzzy_index = phonebook._fuzzy_index
+    terms = grouped((term, c) for c in contacts
+                    for term in {*c.first_name.lower().split(), *c.last_name.lower().split()})
+    assert as_sets(fuzzy_index._term_contacts) == terms
+    assert set(fuzzy_index._contact_terms) == set(contacts)
+    assert fuzzy_index._phonetic_terms == grouped((soundex(term), term) for term in terms)
+    assert set(fuzzy_index._spelling._gram_counts) == set(terms)
+
+    for query in QUERIES:
+        assert phonebook.search_contacts(query) == old_search(contacts, query)
+    for field in ('first_name', 'last_name'):
+        groups = {}
+        for contact in contacts:
+            groups.setdefault(getattr(contact, field)[:1].upper(), []).append(contact)
+        assert phonebook.group_contacts_by_initial(field) == dict(sorted(groups.items()))
+    middle = sorted(c.created_at for c in contacts)[len(contacts) // 2] if contacts else datetime.now()
+    assert phonebook.filter_contacts_by_date(datetime.min, middle) == \
+        sorted((c for c in contacts if c.created_at <= middle), key=lambda c: (c.created_at, phonebook._order[c]))
+
+
+@pytest.mark.parametrize('search_index_class', [TrigramIndex, SubstringScanIndex])
+@pytest.mark.parametrize('seed', range(3))
+def test_indexes_match_brute_force(search_index_class, seed):
+    rng = random.Random(seed)
+    phones = [f"555-{rng.randrange(1000):03d}-{rng.randrange(10000):04d}" for _ in range(25)]
+    phonebook = PhoneBook(search_index_class())
+    check_indexes(phonebook)
+    for _ in range(6):
+        for _ in range(10):
+            phonebook.add_contact(random_contact(rng, phones))
+        batch = [random_contact(rng, phones) for _ in range(40)]
+        # Near-duplicates of existing contacts for deduplicate_contacts to merge
+        for contact in rng.sample(phonebook.contacts, 5):
+            batch.append(Contact(typo(contact.first_name, rng), contact.last_name, contact.phone_number))
+        phonebook.add_contacts(batch)
+        check_indexes(phonebook)
+
+        for contact in rng.sample(phonebook.contacts, 10):
+            replacement = random_contact(rng, phones)
+            assert phonebook.update_contact(contact.first_name, contact.last_name, contact.phone_number, replacement)
+        check_indexes(phonebook)
+
+        phonebook.delete_contact(rng.choice(phones))
+        check_indexes(phonebook)
+        phonebook.delete_contacts_batch([rng.choice(QUERIES[4:]) for _ in range(2)] + [rng.choice(phones)])
+        check_indexes(phonebook)
+
+        phonebook.deduplicate_contacts()
+        check_indexes(phonebook)
+        phonebook.sort_contacts(rng.choice(['first_name', 'last_name']))
+        check_indexes(phonebook)
+
+
+def test_restored_contacts_are_indexed_on_first_use():
+    rng = random.Random(7)
+    phones = [f"555-000-{i:04d}" for i in range(20)]
+    phonebook = PhoneBook()
+    phonebook.restore_contacts([random_contact(rng, phones) for _ in range(60)])
+    phonebook.add_contacts([random_contact(rng, phones) for _ in range(20)])
+    check_indexes(phonebook)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_batch_delete_counts_match_one_at_a_time(seed):
+    rng = random.Random(seed)
+    phones = [f"555-{rng.randrange(1000):03d}-{rng.randrange(10000):04d}" for _ in range(25)]
+    contacts = [random_contact(rng, phones) for _ in range(150)]
+    batch, single = PhoneBook(), PhoneBook()
+    batch.add_contacts(contacts)
+    single.add_contacts([Contact(c.first_name, c.last_name, c.phone_number, c.email, c.address) for c in contacts])
+    # Overlapping queries, such as 'jo' then 'john', and a repeated one
+    phone = rng.choice(phones)
+    queries = ['jo', 'john', 'smith', phone, 'jo', 'zz', phone[4:7], 'ann']
+    expected = {}
+    for query in queries:
+        expected[query] = expected.get(query, 0) + len(single.search_contacts(query))
+        single.delete_contact(query)
+    counts = batch.delete_contacts_batch(queries)
+    assert counts == expected
+    assert counts['john'] == 0 and counts['jo'] > 0 and batch.contacts
+    assert [str(contact) for contact in batch.contacts] == [str(contact) for contact in single.contacts]
+    check_indexes(batch)
@@ -0,0 +1,113 @@
+import os
+import pytest
+from contact import Contact
+from journal import read_records, recover_phonebook
+from phonebook import PhoneBook
+from storage import write_contacts
+
+
+def book_state(phonebook):
+    return [(str(contact), contact.created_at, contact.updated_at, list(contact.history))
+            for contact in phonebook.contacts]
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / 'book.wal'), str(tmp_path / 'book.dat')
+
+
+def recover(paths, **journal_options):
+    return recover_phonebook(*paths, **journal_options)
+
+
+def make_changes(phonebook):
+    """Add, update, delete and merge contacts, returning the expected state."""
+    phonebook.add_contact(Contact('Alice', 'Smith', '555-123-4567', 'alice@example.com', '1 Main St'))
+    phonebook.add_contacts([Contact('Bob', 'Jones', '555-765-4321'),
+                            Contact('Carol', 'Lee', '555-000-0001', 'carol@example.com'),
+                            Contact('Dan', 'Do', '555-000-0002')])
+    phonebook.add_contact(Contact('Alise', 'Smith', '555-123-4567'))
+    phonebook.add_contact(Contact('Bob', 'Jones', '555-765-4321', 'bob@example.com'))
+    assert phonebook.update_contact('Carol', 'Lee', '(555) 000-0001',
+                                    Contact('Carole', 'Lee', '555-000-0003', 'carole@example.com'))
+    assert phonebook.delete_contact('Dan')
+    assert phonebook.deduplicate_contacts() == 2
+    phonebook.add_contact(Contact('Eve', 'Adams', '555-000-0004'))
+    return book_state(phonebook)
+
+
+@pytest.mark.parametrize('compact_every', [0, 3, 100000])
+def test_replay_round_trips_every_operation(paths, compact_every):
+    phonebook = recover(paths, compact_every=compact_every)
+    expected = make_changes(phonebook)
+    phonebook.journal.close()
+    assert len(expected) == 4
+    assert os.path.exists(paths[1]) == (compact_every == 3)
+    recovered = recover(paths)
+    assert book_state(recovered) == expected
+    recovered.journal.close()
+
+
+def test_replay_after_explicit_compaction(paths):
+    phonebook = recover(paths)
+    phonebook.add_contact(Contact('Zed', 'Zulu', '555-999-0000'))
+    phonebook.journal.compact(phonebook)
+    expected = make_changes(phonebook)
+    phonebook.journal.close()
+    recovered = recover(paths)
+    assert book_state(recovered) == expected
+    recovered.journal.close()
+
+
+def test_torn_last_line_is_discarded(paths):
+    phonebook = recover(paths)
+    expected = make_changes(phonebook)
+    phonebook.journal.close()
+    size = os.path.getsize(paths[0])
+    with open(paths[0], 'ab') as file:
+        file.write(b'{"op":"add","contact":{"first_na')
+    recovered = recover(paths)
+    assert book_state(recovered) == expected
+    assert os.path.getsize(paths[0]) == size
+    recovered.add_contact(Contact('Fay', 'Fox', '555-000-0005'))
+    expected = book_state(recovered)
+    recovered.journal.close()
+    records, _ = read_records(paths[0])
+    assert [record['seq'] for record in records] == list(range(1, len(records) + 1))
+    again = recover(paths)
+    assert book_state(again) == expected
+    again.journal.close()
+
+
+def test_crash_between_snapshot_and_truncation(paths):
+    phonebook = recover(paths)
+    expected = make_changes(phonebook)
+    journal = phonebook.journal
+    # What compact does before it truncates the journal
+    journal.sync()
+    write_contacts(phonebook.contacts, journal.snapshot_path, journal.sequence)
+    journal.close()
+    assert read_records(paths[0])[0]
+    recovered = recover(paths)
+    assert book_state(recovered) == expected
+    recovered.add_contact(Contact('Fay', 'Fox', '555-000-0005'))
+    expected = book_state(recovered)
+    recovered.journal.close()
+    again = recover(paths)
+    assert book_state(again) == expected
+    again.journal.close()
+
+
+def test_loaded_and_restored_contacts_are_journaled(paths, tmp_path):
+    file_path = str(tmp_path / 'import.dat')
+    saved = PhoneBook()
+    saved.add_contacts([Contact('Gus', 'Gray', '555-000-0006'), Contact('Hal', 'Hill', '555-000-0007')])
+    saved.save_to_file(file_path)
+    phonebook = recover(paths)
+    assert phonebook.load_from_file(file_path) == 2
+    phonebook.restore_contacts([Contact('Ivy', 'Irving', '555-000-0008')])
+    expected = book_state(phonebook)
+    phonebook.journal.close()
+    recovered = recover(paths)
+    assert book_state(recovered) == expected
+    recovered.journal.close()
@@ -0,0 +1,72 @@
+import sys
+import threading
+from phonebook import PhoneBook
+from contact import Contact
+from result_cache import ResultCache
+
+
+def run_threads(target, count=8):
+    """Run target in count threads with frequent thread switches and return the exceptions raised."""
+    errors = []
+
+    def run():
+        try:
+            target()
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    return errors
+
+
+def test_concurrent_get_and_put_on_one_key():
+    cache = ResultCache(max_entries=2)
+    rounds = 3000
+
+    def hammer():
+        for i in range(rounds):
+            generation = i % 3
+            if cache.get(('search', 'n0'), generation) is None:
+                cache.put(('search', 'n0'), generation, ['a', 'b'])
+            cache.put(('search', f'n{i % 4}'), generation, ['c'])
+
+    assert run_threads(hammer) == []
+    stats = cache.stats()
+    assert stats['hits'] + stats['misses'] == 8 * rounds
+    assert stats['entries'] <= 2
+    assert stats['bytes'] == sum(size for _, _, size in cache._entries.values())
+
+
+def test_concurrent_searches_share_the_cache():
+    phonebook = PhoneBook(result_cache=ResultCache(max_entries=1))
+    for i in range(50):
+        phonebook.add_contact(Contact(f'Name{i}', 'Smith', f'555-{i:07d}'))
+    expected = phonebook.search_contacts('name1')
+    results = []
+
+    def search():
+        for i in range(500):
+            results.append(phonebook.search_contacts('name1') == expected)
+            phonebook.search_contacts(f'name{i % 3 + 2}')
+
+    assert run_threads(search) == []
+    assert all(results)
+
+
+def test_results_are_copies_and_stale_entries_are_not_served():
+    cache = ResultCache()
+    cache.put('key', 1, [1, 2])
+    result = cache.get('key', 1)
+    result.append(3)
+    assert cache.get('key', 1) == [1, 2]
+    assert cache.get('key', 2) is None
+    assert len(cache) == 0
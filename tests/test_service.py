@@ -0,0 +1,58 @@
+import asyncio
+import json
+import pytest
+from phonebook import PhoneBook
+from service import PhoneBookService
+
+
+async def exchange(request):
+    """Send raw request bytes to a fresh service and return (status, payload) of the reply."""
+    service = PhoneBookService(PhoneBook(), workers=2)
+    server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(request)
+        await writer.drain()
+        head = await reader.readuntil(b'\r\n\r\n')
+        status = int(head.split()[1])
+        length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+        payload = json.loads(await reader.readexactly(length))
+        assert await reader.read() == b''
+        writer.close()
+        return status, payload
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.executor.shutdown()
+
+
+@pytest.mark.parametrize('length', [b'abc', b'-5', b'1.5'])
+def test_bad_content_length_is_rejected(length):
+    request = b'POST /contacts HTTP/1.1\r\nContent-Length: ' + length + b'\r\n\r\n{}'
+    status, payload = asyncio.run(exchange(request))
+    assert status == 400
+    assert 'Content-Length' in payload['error']
+
+
+@pytest.mark.parametrize('request_bytes', [
+    b'GET /contacts/search?q=' + b'a' * 100000 + b' HTTP/1.1\r\n\r\n',
+    b'GET /contacts/search?q=a HTTP/1.1\r\nX-Long: ' + b'a' * 100000 + b'\r\n\r\n',
+])
+def test_over_long_line_is_rejected(request_bytes):
+    status, payload = asyncio.run(exchange(request_bytes))
+    assert status == 400
+    assert 'too long' in payload['error']
+
+
+@pytest.mark.parametrize('request_line', [b'GARBAGE', b'GET /contacts', b'GET /contacts HTTP/1.1 extra'])
+def test_malformed_request_line_is_rejected(request_line):
+    status, payload = asyncio.run(exchange(request_line + b'\r\n\r\n'))
+    assert status == 400
+    assert payload['error'] == "Malformed request line"
+
+
+def test_search_request_is_served():
+    request = b'GET /contacts/search?q=a HTTP/1.1\r\nConnection: close\r\n\r\n'
+    status, payload = asyncio.run(exchange(request))
+    assert status == 200
@@ -0,0 +1,80 @@
+import os
+from datetime import datetime
+import pytest
+from benchmark import write_csv
+from contact import Contact
+from phonebook import PhoneBook
+from sharded import ShardedPhoneBook
+
+
+def names(contacts):
+    return [str(contact) for contact in contacts]
+
+
+def assert_same_order(phonebook, sharded):
+    assert names(sharded.contacts) == names(phonebook.contacts)
+    for query in ('smith', 'jo', '555', 'e1'):
+        assert names(sharded.search_contacts(query)) == names(phonebook.search_contacts(query))
+        assert names(sharded.iter_search_contacts(query, 5, 10)) == names(phonebook.iter_search_contacts(query, 5, 10))
+    assert names(sharded.iter_contacts(30, 20)) == names(phonebook.iter_contacts(30, 20))
+    for by in ('first_name', 'last_name'):
+        assert names(sharded.sorted_contacts(by)) == names(phonebook.sorted_contacts(by))
+        assert names(sharded.contacts_in_range('d', 'm', by, 2)) == names(phonebook.contacts_in_range('d', 'm', by, 2))
+        expected = phonebook.group_contacts_by_initial(by)
+        assert {initial: names(group) for initial, group in sharded.group_contacts_by_initial(by).items()} == \
+            {initial: names(group) for initial, group in expected.items()}
+    for by in ('created_at', 'updated_at'):
+        assert names(sharded.filter_contacts_by_date(datetime.min, datetime.max, by)) == \
+            names(phonebook.filter_contacts_by_date(datetime.min, datetime.max, by))
+
+
+@pytest.fixture(scope='module')
+def books(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('sharded') / 'book.csv')
+    write_csv(path, 600)
+    phonebook = PhoneBook()
+    with ShardedPhoneBook(3, audit_options={'filename': os.devnull}) as sharded:
+        for book in (phonebook, sharded):
+            # One chunk, so every contact shares a single created_at
+            assert book.bulk_import_contacts_from_csv(path, chunk_size=1000, workers=0).imported == 600
+        yield phonebook, sharded
+
+
+def test_bulk_import_keeps_book_order(books):
+    phonebook, sharded = books
+    assert len({contact.created_at for contact in phonebook.contacts}) == 1
+    assert_same_order(phonebook, sharded)
+
+
+def test_updates_moves_and_sorts_keep_book_order(books):
+    phonebook, sharded = books
+    for number, contact in enumerate(phonebook.contacts[::40]):
+        replacement = Contact('Zed', contact.last_name, f"555-123-{number:04d}")
+        key = (contact.first_name, contact.last_name, contact.phone_number)
+        for book in (phonebook, sharded):
+            assert book.update_contact(*key, replacement)
+    for book in (phonebook, sharded):
+        book.add_contact(Contact('Ann', 'Smith', '555-999-0000'))
+    assert_same_order(phonebook, sharded)
+    for by in ('last_name', 'first_name', 'last_name'):
+        phonebook.sort_contacts(by)
+        sharded.sort_contacts(by)
+        assert_same_order(phonebook, sharded)
+    for book in (phonebook, sharded):
+        book.add_contact(Contact('Bea', 'Adams', '555-999-0001'))
+    assert_same_order(phonebook, sharded)
+
+
+def test_move_out_and_in_keep_book_order():
+    source, target = PhoneBook(), PhoneBook()
+    for position in range(6):
+        contact = Contact('Ann', f"Lee{position}", f"555-000-{position:04d}")
+        (source if position % 2 else target).add_contact(contact, position)
+    old = source.contacts[1]
+    position, moved = source.move_out(old.first_name, old.last_name, old.phone_number,
+                                      Contact('Ann', 'Moved', '555-000-0003'))
+    assert position == 3 and moved not in source.contacts
+    target.move_in(moved, position)
+    assert [contact.last_name for contact in target.contacts] == ['Lee0', 'Lee2', 'Moved', 'Lee4']
+    assert target.search_contacts('moved') == [moved]
+    assert source.move_out('Ann', 'Lee3', old.phone_number, moved) is None
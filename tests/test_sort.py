@@ -0,0 +1,118 @@
+import random
+from datetime import datetime
+import pytest
+from contact import Contact
+from phonebook import PhoneBook
+
+FIRST_NAMES = ['Ann', 'Bob', 'Cy', 'Al', 'bea']
+LAST_NAMES = ['Smith', 'Jones', 'adams', 'Baker']
+
+
+def build(count, seed=0):
+    rng = random.Random(seed)
+    phonebook = PhoneBook()
+    contacts = []
+    for i in range(count):
+        contact = Contact(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"555-000-{i:04d}")
+        phonebook.add_contact(contact)
+        contacts.append(contact)
+    for contact in contacts[::7]:
+        phonebook.update_contact(contact.first_name, contact.last_name, contact.phone_number,
+                                 Contact(rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), contact.phone_number))
+    return phonebook, contacts
+
+
+def test_sort_is_stable_like_list_sort():
+    phonebook, expected = build(300)
+    for by in ('last_name', 'first_name', 'first_name', 'last_name', 'first_name'):
+        expected.sort(key=lambda contact: getattr(contact, by).lower())
+        phonebook.sort_contacts(by)
+        assert phonebook.contacts == expected
+        assert list(phonebook.iter_contacts(100, 50)) == expected[100:150]
+        assert phonebook.sorted_contacts(by) == expected
+        other = 'first_name' if by == 'last_name' else 'last_name'
+        names = [getattr(contact, other).lower() for contact in phonebook.sorted_contacts(other)]
+        assert names == sorted(names)
+
+
+def test_sorted_book_keeps_later_changes_in_order():
+    phonebook, contacts = build(200, seed=2)
+    phonebook.sort_contacts('last_name')
+    phonebook.sort_contacts('first_name')
+    phonebook.add_contact(Contact('Ann', 'Aaron', '555-111-0000'))
+    changed = contacts[5]
+    phonebook.update_contact(changed.first_name, changed.last_name, changed.phone_number,
+                             Contact('Al', 'Zed', changed.phone_number))
+    expected = sorted(phonebook.contacts, key=lambda contact: (contact.first_name.lower(), contact.last_name.lower()))
+    assert phonebook.contacts == expected
+    generation = phonebook._generation
+    phonebook.sort_contacts('first_name')
+    assert phonebook._generation == generation
+    assert phonebook.contacts == expected
+
+
+def test_groups_follow_book_order():
+    phonebook, contacts = build(200, seed=1)
+    phonebook.sort_contacts('first_name')
+    groups = phonebook.group_contacts_by_initial('last_name')
+    expected = {}
+    for contact in phonebook.contacts:
+        expected.setdefault(contact.last_name[:1].upper(), []).append(contact)
+    assert groups == dict(sorted(expected.items()))
+    assert list(groups) == sorted(expected)
+
+
+def pages(iterate, cursor, size):
+    """Collect every page of an iterating method, resuming each page after the last contact of the one before."""
+    contacts = []
+    page = list(iterate(limit=size))
+    while page:
+        contacts += page
+        page = list(iterate(limit=size, after=cursor(page[-1])))
+    return contacts
+
+
+@pytest.mark.parametrize('by', [None, 'last_name', 'first_name'])
+def test_cursors_resume_after_a_contact(by):
+    phonebook, _ = build(300)
+    if by is not None:
+        phonebook.sort_contacts(by)
+    contacts = phonebook.contacts
+    assert pages(phonebook.iter_contacts, phonebook.contact_cursor, 40) == contacts
+    assert pages(lambda **page: phonebook.iter_search_contacts('a', **page), phonebook.contact_cursor, 15) == \
+        phonebook.search_contacts('a')
+    # A cursor still resumes after its contact once that contact is deleted
+    cursor = phonebook.contact_cursor(contacts[100])
+    phonebook.delete_contact(contacts[100].phone_number)
+    assert list(phonebook.iter_contacts(5, 10, after=cursor)) == contacts[106:116]
+
+
+def test_cursor_from_before_a_sort_is_refused():
+    phonebook, _ = build(50)
+    cursor = phonebook.contact_cursor(phonebook.contacts[10])
+    phonebook.sort_contacts('last_name')
+    with pytest.raises(ValueError):
+        phonebook.iter_contacts(after=cursor)
+    with pytest.raises(ValueError):
+        list(phonebook.iter_search_contacts('a', after=cursor))
+    # Sorting again by the same name leaves book order, and its cursors, as they are
+    cursor = phonebook.contact_cursor(phonebook.contacts[10])
+    phonebook.sort_contacts('last_name')
+    assert list(phonebook.iter_contacts(limit=5, after=cursor)) == phonebook.contacts[11:16]
+
+
+def test_date_cursors_resume_after_a_contact():
+    phonebook, contacts = build(200)
+    for by in ('created_at', 'updated_at'):
+        expected = phonebook.filter_contacts_by_date(datetime.min, datetime.max, by)
+        assert pages(lambda **page: phonebook.iter_contacts_by_date(datetime.min, datetime.max, by, **page),
+                     lambda contact: phonebook.contact_cursor(contact, by), 30) == expected
+    middle = datetime.now()
+    cursor = phonebook.contact_cursor(contacts[20], 'created_at')
+    assert list(phonebook.iter_contacts_by_date(datetime.min, middle, limit=5, after=cursor)) == contacts[21:26]
+    with pytest.raises(ValueError):
+        phonebook.iter_contacts_by_date(datetime.min, middle, 'updated_at', after=cursor)
+    with pytest.raises(ValueError):
+        phonebook.iter_contacts(after=cursor)
+    with pytest.raises(ValueError):
+        phonebook.iter_contacts_by_date(datetime.min, middle, after=phonebook.contact_cursor(contacts[20]))
@@ -0,0 +1,80 @@
+import pytest
+from contact import Contact
+from phonebook import PhoneBook
+from storage import ContactFile, StorageError, write_contacts
+
+
+def make_contacts():
+    return [Contact('Alice', 'Smith', '555-123-4567', 'alice@example.com', '1 Main St'),
+            Contact('Bob', 'Jones', '555-765-4321')]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'book.dat')
+    contacts = make_contacts()
+    contacts[0].update_history('A')
+    write_contacts(contacts, path, sequence=7)
+    with ContactFile(path) as contact_file:
+        assert contact_file.sequence == 7
+        loaded = list(contact_file)
+    assert [str(contact) for contact in loaded] == [str(contact) for contact in contacts]
+    assert loaded[0].history == contacts[0].history
+    assert loaded[1].email is None
+
+
+def test_load_defers_text_indexes_until_search(tmp_path):
+    path = str(tmp_path / 'book.dat')
+    write_contacts(make_contacts(), path)
+    phonebook = PhoneBook()
+    assert phonebook.load_from_file(path) == 2
+    assert len(phonebook._search_index) == 0
+    assert [contact.first_name for contact in phonebook.search_contacts('o')] == ['Bob']
+    assert len(phonebook._search_index) == 2
+    assert phonebook.delete_contact('Alice')
+    assert [contact.first_name for contact in phonebook.fuzzy_search_contacts('Bobb')] == ['Bob']
+
+
+def test_load_materializes_records_on_access(tmp_path):
+    path = str(tmp_path / 'book.dat')
+    write_contacts([Contact('Ann', f'Lee{i}', f'555-000-{i:04d}') for i in range(50)], path)
+    phonebook = PhoneBook()
+    phonebook.add_contact(Contact('Zed', 'First', '555-999-0000'))
+    assert phonebook.load_from_file(path) == 50
+    assert len(phonebook) == 51
+    page = list(phonebook.iter_contacts(10, 5))
+    assert [contact.last_name for contact in page] == [f'Lee{i}' for i in range(9, 14)]
+    assert len(phonebook._pending._contacts) == 5
+    after = phonebook.contact_cursor(page[-1])
+    assert [contact.last_name for contact in phonebook.iter_contacts(limit=2, after=after)] == ['Lee14', 'Lee15']
+    assert phonebook._pending is not None
+
+    assert phonebook.find_contacts_by_phone(page[0].phone_number) == [page[0]]
+    assert phonebook._pending is None
+    assert len(phonebook._search_index) == 1
+    assert phonebook.contacts[10:15] == page
+    phonebook.add_contact(Contact('Amy', 'Last', '555-999-0001'))
+    assert [contact.last_name for contact in phonebook.contacts[:2]] == ['First', 'Lee0']
+    assert phonebook.contacts[-1].last_name == 'Last'
+
+
+@pytest.mark.parametrize('cut', [1, 10, 30])
+def test_truncated_heap_raises(tmp_path, cut):
+    path = str(tmp_path / 'book.dat')
+    write_contacts(make_contacts(), path)
+    with open(path, 'rb') as file:
+        data = file.read()
+    with open(path, 'wb') as file:
+        file.write(data[:-cut])
+    phonebook = PhoneBook()
+    phonebook.load_from_file(path)
+    with pytest.raises(StorageError):
+        phonebook.search_contacts('a')
+
+
+def test_truncated_record_table_raises(tmp_path):
+    path = str(tmp_path / 'book.dat')
+    write_contacts(make_contacts(), path)
+    with open(path, 'r+b') as file:
+        file.truncate(40)
+    with pytest.raises(StorageError):
+        ContactFile(path)
@@ -0,0 +1,87 @@
+from datetime import datetime
+import pytest
+from contact import Contact
+from phonebook import PhoneBook
+from timing import OperationTimings, timed
+
+
+def test_operation_timings_accumulate_and_merge():
+    timings = OperationTimings()
+    for seconds in (0.002, 0.006, 0.004):
+        timings.record('search_contacts', seconds)
+    timings.record('add_contact', 0.001)
+    stats = timings.stats()
+    assert list(stats) == ['add_contact', 'search_contacts']
+    assert stats['search_contacts']['calls'] == 3
+    assert stats['search_contacts']['total_ms'] == pytest.approx(12)
+    assert stats['search_contacts']['mean_ms'] == pytest.approx(4)
+    assert stats['search_contacts']['max_ms'] == pytest.approx(6)
+
+    other = OperationTimings()
+    other.record('search_contacts', 0.010)
+    other.merge(stats)
+    merged = other.stats()['search_contacts']
+    assert (merged['calls'], merged['total_ms'], merged['max_ms']) == (4, pytest.approx(22), pytest.approx(10))
+    timings.reset()
+    assert timings.stats() == {}
+
+
+class Worker:
+    def __init__(self):
+        self._timings = OperationTimings()
+
+    @timed
+    def outer(self):
+        return self.inner() + 1
+
+    @timed
+    def inner(self):
+        return 1
+
+    @timed
+    def fail(self):
+        raise ValueError("failed")
+
+
+def test_timed_counts_nested_and_failed_calls():
+    worker = Worker()
+    assert worker.outer() == 2 and worker.outer.__name__ == 'outer'
+    with pytest.raises(ValueError):
+        worker.fail()
+    stats = worker._timings.stats()
+    assert {name: stat['calls'] for name, stat in stats.items()} == {'fail': 1, 'inner': 1, 'outer': 1}
+    # An outer call's time includes the inner one it made
+    assert stats['outer']['total_ms'] >= stats['inner']['total_ms']
+
+
+def test_operation_stats_count_calls():
+    phonebook = PhoneBook()
+    phonebook.add_contact(Contact('Ann', 'Lee', '555-123-4567'))
+    phonebook.add_contact(Contact('Bob', 'Jones', '555-765-4321'))
+    phonebook.add_contacts([Contact('Cy', 'Do', f"555-000-000{i}") for i in range(3)])
+    phonebook.search_contacts('ann')
+    phonebook.search_contacts('jones')
+    phonebook.update_contact('Bob', 'Jones', '(555) 765-4321', Contact('Bob', 'Jones', '555-765-4322'))
+    phonebook.update_contact('Nobody', 'Here', '(555) 000-0000', Contact('Bob', 'Jones', '555-765-4322'))
+    phonebook.delete_contact('555-000-0001')
+    phonebook.delete_contacts_batch(['555-000-0002', 'ann'])
+    phonebook.sort_contacts('last_name')
+    phonebook.filter_contacts_by_date(datetime.min, datetime.max, count_only=True)
+    phonebook.deduplicate_contacts()
+    stats = phonebook.operation_stats()
+    # delete_contact runs a search and update_contact a find_exact_contact, which count as their own calls
+    assert {name: stat['calls'] for name, stat in stats.items()} == {
+        'add_contact': 2,
+        'add_contacts': 1,
+        'deduplicate_contacts': 1,
+        'delete_contact': 1,
+        'delete_contacts_batch': 1,
+        'filter_contacts_by_date': 1,
+        'find_exact_contact': 2,
+        'search_contacts': 3,
+        'sort_contacts': 1,
+        'update_contact': 2,
+    }
+    assert stats['delete_contact']['total_ms'] >= stats['delete_contact']['max_ms'] > 0
+    phonebook.reset_operation_stats()
+    assert phonebook.operation_stats() == {}
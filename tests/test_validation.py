@@ -0,0 +1,26 @@
+from validation import format_phone_number, format_phone_numbers, validate_email, validate_emails
+
+# Separators str.translate removes, others left to the regular expression, and values that are not strings
+PHONES = ['555-123-4567', '(555) 123-4567', '555.123.4567', '555 123 4567', '555/123/4567', '5551234567',
+          '555_123_4567', '555\t123\t4567', 'tel:555-123-4567', '555-123-4567 x89', '555-1234', '',
+          '５５５-１２３-４５６７', '555–123–4567', None, 5551234567, ['555-123-4567']]
+EMAILS = ['ann@example.com', 'Ann.Lee-1@mail.example.co', 'ann@example', 'ann example@x.com', '@example.com',
+          '', None, 0, 'ann@example.com\n', 42, b'ann@example.com']
+
+
+def single(validate, value):
+    """Return what a single-value validator gives for a value, or None when it rejects it."""
+    try:
+        return validate(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def test_format_phone_numbers_matches_format_phone_number():
+    assert format_phone_numbers(PHONES) == [single(format_phone_number, phone) for phone in PHONES]
+    assert format_phone_numbers(PHONES)[:6] == ['(555) 123-4567'] * 6
+
+
+def test_validate_emails_matches_validate_email():
+    assert validate_emails(EMAILS) == [single(validate_email, email) is not None or not email for email in EMAILS]
+    assert validate_emails(EMAILS)[:2] == [True, True]